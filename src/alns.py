@@ -29,13 +29,31 @@ from removal import shaw_removal, random_removal, worst_removal
 from insertion import basic_greedy_insertion, regret_insertion_wrapper
 import random
 import math
-from typing import Callable, List, Tuple
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Callable, List, Optional, Tuple
 from meta import Meta
 from solution import PDWTWSolution
 
 # Constants
 ACCEPTED_SET_MAXLEN = 25000  # Maximum size of accepted solution set to prevent memory overflow
 
+class OperatorWeights:
+	"""Adaptive operator weights, passed to successive ALNS runs so that each starts from the weights of the last.
+	
+	Attributes:
+		removal: Weights of shaw, random and worst removal
+		insertion: Weights of greedy insertion and the regret-k insertions of the distinct degrees among
+			2, 3, 4 and m, see adaptive_large_neighbourhood_search
+		noise: Weights of the objective without and with noise
+	"""
+	__slots__ = ('removal', 'insertion', 'noise')
+	
+	def __init__(self, initial_weight: float) -> None:
+		self.removal: List[float] = [initial_weight] * 3
+		self.insertion: List[float] = [initial_weight] * 5
+		self.noise: List[float] = [initial_weight] * 2
+
 def _objective_noise_wrapper(meta_obj: Meta, use_noise: bool, max_distance: float) -> Callable[[float], float]:
 	"""Create an objective function wrapper that optionally adds noise.
 	
@@ -55,34 +73,42 @@ def _objective_noise_wrapper(meta_obj: Meta, use_noise: bool, max_distance: floa
 		return cost
 	return _objective_noise
 
-def _select_function_with_weight(funcs: List[Callable], weights: List[float]) -> Tuple[Callable, int]:
+def _cumulative_weights(weights: List[float]) -> List[float]:
+	"""Build the cumulative weights used by _select_function_with_weight.
+	
+	Args:
+		weights: Weights of the functions, negative weights count as zero
+		
+	Returns:
+		Prefix sums of the weights
+	"""
+	return list(accumulate(max(0.0, w) for w in weights))
+
+def _select_function_with_weight(funcs: List[Callable], cum_weights: List[float]) -> Tuple[Callable, int]:
 	"""Select a function from a list using weighted random selection.
 	
+	Draws like random.choices(range(len(funcs)), cum_weights=cum_weights), so the
+	random state advances the same way, without rebuilding the prefix sums per call.
+	
 	Args:
 		funcs: List of functions to choose from
-		weights: Corresponding weights for each function
+		cum_weights: Cumulative weights of the functions, see _cumulative_weights
 		
 	Returns:
 		Tuple of (selected_function, index_of_selected_function)
 		
 	Raises:
-		ValueError: If lengths of funcs and weights don't match or weights are invalid
+		ValueError: If lengths of funcs and cum_weights don't match
 	"""
-	if len(funcs) != len(weights):
+	if len(funcs) != len(cum_weights):
 		raise ValueError('weights must have same length as funcs!')
 	
-	# Handle case where all weights are zero or negative
-	if all(w <= 0 for w in weights):
+	total = cum_weights[-1]
+	if total <= 0.0:
 		# Fallback to uniform selection if all weights are zero/negative
 		selected_index = random.randint(0, len(funcs) - 1)
 	else:
-		# Ensure all weights are non-negative for random.choices
-		positive_weights = [max(0.0, w) for w in weights]
-		selected_index = random.choices(
-			range(len(funcs)),
-			weights=positive_weights,
-			k=1
-		)[0]
+		selected_index = bisect_right(cum_weights, random.random() * total, 0, len(funcs) - 1)
 
 	return funcs[selected_index], selected_index
 
@@ -121,8 +147,29 @@ def _assert_len_equal(w_list: List[float], reward_list: List[float], theta_list:
 	"""
 	assert len(w_list) == len(reward_list) and len(theta_list) == len(w_list)
 
+def _update_weights(w_list: List[float], reward_list: List[float], theta_list: List[int], r: float) -> None:
+	"""Update operator weights in place at the end of a segment.
+	
+	Each weight moves towards the average reward of its operator in the segment
+	with reaction factor r, and stays above 1e-8 so that it can still be selected.
+	
+	Args:
+		w_list: List of weights, updated in place
+		reward_list: List of rewards collected in the segment
+		theta_list: List of usage counts in the segment
+		r: Reaction factor in [0, 1]
+	"""
+	_assert_len_equal(w_list, reward_list, theta_list)
+	one_minus_r = 1 - r
+	for i, (w, reward, theta) in enumerate(zip(w_list, reward_list, theta_list)):
+		if theta > 0:
+			w_list[i] = max(1e-8, one_minus_r * w + r * (reward / theta))
+		else:
+			w_list[i] = max(1e-8, w)
+
 def adaptive_large_neighbourhood_search(meta_obj: Meta, initial_solution: PDWTWSolution, insert_unlimited: bool,
-                                        stop_if_all_request_coped: bool) -> Tuple[PDWTWSolution, int]:
+                                        stop_if_all_request_coped: bool,
+                                        operator_weights: Optional[OperatorWeights] = None) -> Tuple[PDWTWSolution, int]:
 	"""Adaptive Large Neighbourhood Search (ALNS) algorithm for PDWTW problems.
 	
 	This function implements the ALNS metaheuristic which iteratively improves
@@ -135,6 +182,8 @@ def adaptive_large_neighbourhood_search(meta_obj: Meta, initial_solution: PDWTWS
 		initial_solution: Starting solution to improve
 		insert_unlimited: Whether to allow unlimited insertions
 	    stop_if_all_request_coped: Stop the iteration and return the 'feasible' solution immediately if it is set True
+		operator_weights: Weights to start from, updated in place as the search adapts them;
+			fresh initial weights if None
 	Returns:
 		Best solution found during the search
 		
@@ -184,27 +233,41 @@ def adaptive_large_neighbourhood_search(meta_obj: Meta, initial_solution: PDWTWS
 	if q_lower_bound < 1:
 		raise ValueError("q_lower_bound must be at least 1")
 	
-	# Initialize removal operators with equal weights
-	w_removal = [meta_obj.parameters.initial_weight, meta_obj.parameters.initial_weight, meta_obj.parameters.initial_weight]
+	# Operator weights, equal unless carried over from an earlier run
+	if operator_weights is None:
+		operator_weights = OperatorWeights(meta_obj.parameters.initial_weight)
+	
+	# Initialize removal operators
+	w_removal = operator_weights.removal
 	removal_function_list = [shaw_removal, random_removal, worst_removal]
 	removal_rewards = [0, 0, 0]  # Cumulative rewards for each operator
 	removal_theta = [0, 0, 0]    # Usage count for each operator
 	
 	# Initialize insertion operators (greedy + regret-k with varying k values)
 	m = len(initial_solution.paths) + len(initial_solution.vehicle_bank)
-	w_insertion = [meta_obj.parameters.initial_weight, meta_obj.parameters.initial_weight, meta_obj.parameters.initial_weight, meta_obj.parameters.initial_weight, meta_obj.parameters.initial_weight]
-	insertion_function_list = [basic_greedy_insertion, regret_insertion_wrapper(2), regret_insertion_wrapper(3),
-	                           regret_insertion_wrapper(4), regret_insertion_wrapper(m)]
-	insertion_rewards = [0, 0, 0, 0, 0]  # Cumulative rewards for each operator
-	insertion_theta = [0, 0, 0, 0, 0]    # Usage count for each operator
+	# regret degrees are capped by the fleet size; each degree gets one operator, so that
+	# small fleets do not split the weight of one operator over several slots
+	regret_degrees = list(dict.fromkeys(min(k, m) for k in (2, 3, 4, m) if min(k, m) >= 2))
+	insertion_function_list = [basic_greedy_insertion] + [regret_insertion_wrapper(k) for k in regret_degrees]
+	if len(operator_weights.insertion) != len(insertion_function_list):
+		# carried weights belong to another set of degrees, start over
+		operator_weights.insertion = [meta_obj.parameters.initial_weight] * len(insertion_function_list)
+	w_insertion = operator_weights.insertion
+	insertion_rewards = [0] * len(insertion_function_list)  # Cumulative rewards for each operator
+	insertion_theta = [0] * len(insertion_function_list)    # Usage count for each operator
 
 	# Initialize noise operators (with/without objective noise - part 3.6 in the paper)
-	w_noise = [meta_obj.parameters.initial_weight, meta_obj.parameters.initial_weight]
+	w_noise = operator_weights.noise
 	noise_rewards = [0, 0]  # Cumulative rewards for each noise option
 	noise_theta = [0, 0]    # Usage count for each noise option
 	max_distance = meta_obj.get_max_distance()
 	noise_function_list = [_objective_noise_wrapper(meta_obj, False, max_distance),
 	                       _objective_noise_wrapper(meta_obj, True, max_distance)]
+	
+	# Weights only change at segment boundaries, keep their prefix sums for selection
+	cum_w_removal = _cumulative_weights(w_removal)
+	cum_w_insertion = _cumulative_weights(w_insertion)
+	cum_w_noise = _cumulative_weights(w_noise)
 
 	# Initialize solution tracking
 	s_best = initial_solution.copy()  # Best solution found so far
@@ -216,6 +279,12 @@ def adaptive_large_neighbourhood_search(meta_obj: Meta, initial_solution: PDWTWS
 
 	accepted_solution_set: set = set()  # Track accepted solution fingerprints to avoid cycles
 	
+	# Parameters read on every iteration, fixed for the whole search
+	new_best_reward, improvement_reward, acceptance_reward = meta_obj.parameters.reward_adds[:3]
+	segment_num = meta_obj.parameters.segment_num
+	r = meta_obj.parameters.r
+	c = meta_obj.parameters.c
+	
 	# Main ALNS loop
 	print('start alns loop, total iteration_num : ', meta_obj.parameters.iteration_num)
 	total_iteration_num = 0
@@ -228,40 +297,41 @@ def adaptive_large_neighbourhood_search(meta_obj: Meta, initial_solution: PDWTWS
 		q = random.randint(q_lower_bound, q_upper_bound)
 		
 		# Select operators using adaptive weights
-		remove_func, remove_func_idx = _select_function_with_weight(removal_function_list, w_removal)
-		insertion_func, insertion_func_idx = _select_function_with_weight(insertion_function_list, w_insertion)
+		remove_func, remove_func_idx = _select_function_with_weight(removal_function_list, cum_w_removal)
+		insertion_func, insertion_func_idx = _select_function_with_weight(insertion_function_list, cum_w_insertion)
 
 		# Select noise function (note: uses global random state, tests should not run in parallel)
-		noise_func, noise_func_idx = _select_function_with_weight(noise_function_list, w_noise)
+		noise_func, noise_func_idx = _select_function_with_weight(noise_function_list, cum_w_noise)
 		
 		# Track operator usage
 		removal_theta[remove_func_idx] += 1
 		insertion_theta[insertion_func_idx] += 1
 		noise_theta[noise_func_idx] += 1
 		
-		# Apply to destroy and repair operations
-		s_p = s.copy()  # Create candidate solution
-		remove_func(meta_obj, s_p, q)  # Destroy: remove q requests
-		insertion_func(meta_obj, s_p, q, insert_unlimited, noise_func)  # Repair: reinsert requests
+		# Apply destroy and repair operations in place, journaled so they can be rolled back
+		original_cost = s.objective_cost
+		s_token = s.snapshot()
+		remove_func(meta_obj, s, q)  # Destroy: remove q requests
+		insertion_func(meta_obj, s, q, insert_unlimited, noise_func)  # Repair: reinsert requests
 		
 		# Skip if this solution configuration was already explored
 		# finger_print唯一性依赖，需保证finger_print实现唯一且不可变
-		if s_p.finger_print in accepted_solution_set:
+		if s.finger_print in accepted_solution_set:
+			s.restore(s_token)
 			total_iteration_num += 1
 			continue
 
 		# Pre-calculate objective cost and determine acceptance
-		s_p_cost = s_p.objective_cost
-		original_cost = s.objective_cost
+		s_p_cost = s.objective_cost
 		
 		# Check if new best solution found
 		is_new_best = False
 		if s_p_cost < s_best.objective_cost:
 			is_new_best = True
 			# Reward operators for finding new best solution
-			removal_rewards[remove_func_idx] += meta_obj.parameters.reward_adds[0]
-			insertion_rewards[insertion_func_idx] += meta_obj.parameters.reward_adds[0]
-			noise_rewards[noise_func_idx] += meta_obj.parameters.reward_adds[0]
+			removal_rewards[remove_func_idx] += new_best_reward
+			insertion_rewards[insertion_func_idx] += new_best_reward
+			noise_rewards[noise_func_idx] += new_best_reward
 
 		# Solution acceptance logic (simulated annealing)
 		is_accepted = False
@@ -270,9 +340,9 @@ def adaptive_large_neighbourhood_search(meta_obj: Meta, initial_solution: PDWTWS
 			is_accepted = True
 			if not is_new_best:
 				# Reward for improving current solution (but not global best)
-				removal_rewards[remove_func_idx] += meta_obj.parameters.reward_adds[1]
-				insertion_rewards[insertion_func_idx] += meta_obj.parameters.reward_adds[1]
-				noise_rewards[noise_func_idx] += meta_obj.parameters.reward_adds[1]
+				removal_rewards[remove_func_idx] += improvement_reward
+				insertion_rewards[insertion_func_idx] += improvement_reward
+				noise_rewards[noise_func_idx] += improvement_reward
 		else:
 			# Consider accepting worse solutions based on temperature
 			delta_objective_cost = s_p_cost - original_cost
@@ -282,61 +352,42 @@ def adaptive_large_neighbourhood_search(meta_obj: Meta, initial_solution: PDWTWS
 				# Accept worse solution with probability based on temperature
 				is_accepted = True
 				# Reward for diversification
-				removal_rewards[remove_func_idx] += meta_obj.parameters.reward_adds[2]
-				insertion_rewards[insertion_func_idx] += meta_obj.parameters.reward_adds[2]
-				noise_rewards[noise_func_idx] += meta_obj.parameters.reward_adds[2]
+				removal_rewards[remove_func_idx] += acceptance_reward
+				insertion_rewards[insertion_func_idx] += acceptance_reward
+				noise_rewards[noise_func_idx] += acceptance_reward
 
 		# Only copy when necessary - significant optimization!
 		if is_new_best:
-			s_best = s_p.copy()  # Copy only when new best found
+			s_best = s.copy()  # Copy only when new best found
 		
 		if is_accepted:
-			s = s_p  # Transfer ownership instead of copy
-			accepted_solution_set.add(s_p.finger_print)
+			s.release_snapshot(s_token)  # Keep the candidate as the current solution
+			accepted_solution_set.add(s.finger_print)
 			# 控制accepted_solution_set最大容量，避免内存溢出
 			if len(accepted_solution_set) > ACCEPTED_SET_MAXLEN:
 				accepted_solution_set.pop()
+		else:
+			s.restore(s_token)  # Roll the candidate back to the current solution
 
 		# Adaptive weight update at segment boundaries
-		if ((total_iteration_num + 1) % meta_obj.parameters.segment_num) == 0:
-			# Precompute common values for efficiency
-			r = meta_obj.parameters.r
-			one_minus_r = 1 - r
-			
-			# Update removal operator weights based on performance
-			_assert_len_equal(w_removal, removal_theta, removal_rewards)
-			for i in range(len(w_removal)):
-				if removal_theta[i] > 0:
-					w_removal[i] = max(1e-8, one_minus_r * w_removal[i] + r * (removal_rewards[i] / removal_theta[i]))
-				else:
-					w_removal[i] = max(1e-8, w_removal[i])
-			
-			# Update insertion operator weights based on performance
-			_assert_len_equal(w_insertion, insertion_rewards, insertion_theta)
-			for i in range(len(w_insertion)):
-				if insertion_theta[i] > 0:
-					w_insertion[i] = max(1e-8, one_minus_r * w_insertion[i] + r * (insertion_rewards[i] / insertion_theta[i]))
-				else:
-					w_insertion[i] = max(1e-8, w_insertion[i])
-			
-			# Update noise operator weights based on performance
-			_assert_len_equal(w_noise, noise_rewards, noise_theta)
-			for i in range(len(w_noise)):
-				if noise_theta[i] > 0:
-					w_noise[i] = max(1e-8, one_minus_r * w_noise[i] + r * (noise_rewards[i] / noise_theta[i]))
-				else:
-					w_noise[i] = max(1e-8, w_noise[i])
+		if ((total_iteration_num + 1) % segment_num) == 0:
+			_update_weights(w_removal, removal_rewards, removal_theta, r)
+			_update_weights(w_insertion, insertion_rewards, insertion_theta, r)
+			_update_weights(w_noise, noise_rewards, noise_theta, r)
+			cum_w_removal = _cumulative_weights(w_removal)
+			cum_w_insertion = _cumulative_weights(w_insertion)
+			cum_w_noise = _cumulative_weights(w_noise)
 
 			# Reset statistics for next segment
 			removal_rewards = [0, 0, 0]
 			removal_theta = [0, 0, 0]
-			insertion_rewards = [0, 0, 0, 0, 0]
-			insertion_theta = [0, 0, 0, 0, 0]
+			insertion_rewards = [0] * len(insertion_function_list)
+			insertion_theta = [0] * len(insertion_function_list)
 			noise_rewards = [0, 0]
 			noise_theta = [0, 0]
 
 		# Cool down temperature for simulated annealing (prevent underflow)
-		t_current = max(1e-10, t_current * meta_obj.parameters.c)
+		t_current = max(1e-10, t_current * c)
 		total_iteration_num += 1
 		if stop_if_all_request_coped and 0 == len(s_best.request_bank):
 			break
@@ -42,7 +42,7 @@ from parameters import Parameters
 from benchmark_reader import BenchmarkReader
 from vehicle import Vehicle
 from node import Node
-from request import Request
+from request import Request, vehicle_mask_of
 import math
 
 
@@ -176,22 +176,29 @@ class LiLimBenchmarkReader(BenchmarkReader):
 				# Fill both (key1, key2) and (key2, key1) simultaneously
 				new_meta_obj.distances[key1][key2] = distance
 				new_meta_obj.distances[key2][key1] = distance
+		
+		# checked once here instead of on every rebuild of Meta.distance_matrix, see Meta.distances
+		distances = new_meta_obj.distances
+		if any(distances[key2][key1] != distance
+		       for key1, to_node_dict in distances.items() for key2, distance in to_node_dict.items()):
+			raise ValueError("distances must be symmetric")
 			
-		# Initialize vehicle_run_between_nodes_time of Meta
-		new_meta_obj.vehicle_run_between_nodes_time = {}
-		for vehicle_id in new_meta_obj.vehicles.keys():
-			new_meta_obj.vehicle_run_between_nodes_time[vehicle_id] = {}
-			for key1 in new_meta_obj.nodes.keys():
-				new_meta_obj.vehicle_run_between_nodes_time[vehicle_id][key1] = {}
-				for key2 in new_meta_obj.nodes.keys():
-					# Calculate travel time = distance / speed
-					distance = new_meta_obj.distances[key1][key2]
-					travel_time = distance / self.problem_params.vehicle_speed if self.problem_params.vehicle_speed > 0 else distance
-					new_meta_obj.vehicle_run_between_nodes_time[vehicle_id][key1][key2] = travel_time
+		# Initialize vehicle_run_between_nodes_time of Meta, all vehicles have the same speed and share one table
+		run_time_table = {}
+		for key1 in new_meta_obj.nodes.keys():
+			run_time_table[key1] = {}
+			for key2 in new_meta_obj.nodes.keys():
+				# Calculate travel time = distance / speed
+				distance = new_meta_obj.distances[key1][key2]
+				travel_time = distance / self.problem_params.vehicle_speed if self.problem_params.vehicle_speed > 0 else distance
+				run_time_table[key1][key2] = travel_time
+		new_meta_obj.vehicle_run_between_nodes_time = {vehicle_id: run_time_table for vehicle_id in new_meta_obj.vehicles.keys()}
 					
 		# Initialize requests of Meta
 		new_meta_obj.requests = {}
 		vehicle_ids = set(new_meta_obj.vehicles.keys())
+		# every request may use every vehicle, so the bitmask is shared by all of them
+		vehicle_mask = vehicle_mask_of(vehicle_ids)
 		
 		# Get pickup-delivery pairs using the existing method
 		pickup_delivery_pairs = self.get_pickup_delivery_pairs()
@@ -209,7 +216,8 @@ class LiLimBenchmarkReader(BenchmarkReader):
 				pickup_node_id=pickup_node_id,
 				delivery_node_id=delivery_node_id,
 				require_capacity=require_capacity,
-				vehicle_set=vehicle_ids.copy()
+				vehicle_set=vehicle_ids.copy(),
+				vehicle_mask=vehicle_mask
 			)
 			request_id += 1
 		
@@ -25,8 +25,7 @@ SOFTWARE.
 """
 
 
-import copy
-from typing import Dict, Callable, Optional, List, Tuple, Any
+from typing import Dict, Callable, Optional, List, Tuple
 from meta import Meta
 from solution import PDWTWSolution
 
@@ -68,11 +67,19 @@ def _get_request_vehicle_cost(meta_obj: Meta, one_solution: PDWTWSolution,
     if len(vehicles) < len(one_solution.vehicle_bank) + len(one_solution.paths):
         raise ValueError("Vehicle IDs must all be unique in one solution's vehicle bank and paths!")
     
+    unlimited_float_bound = float(meta_obj.parameters.unlimited_float_bound)
+    
     # Calculate insertion costs for each request-vehicle pair
     for request_id in one_solution.request_bank:
         request_vehicle_cost[request_id] = {}
+        compatible_vehicles = meta_obj.requests[request_id].vehicle_set
         
         for vehicle_id in vehicles:
+            # Incompatible vehicles never need a path evaluation
+            if vehicle_id not in compatible_vehicles:
+                request_vehicle_cost[request_id][vehicle_id] = unlimited_float_bound
+                continue
+            
             ok, cost = one_solution.cost_if_insert_request_to_vehicle_path(request_id, vehicle_id)
             
             if not ok:
@@ -98,7 +105,7 @@ def _update_request_vehicle_cost(meta_obj: Meta, already_inserted_path_vehicle_i
     Args:
         meta_obj: Meta object containing problem parameters
         already_inserted_path_vehicle_id: Vehicle ID where request was inserted
-        request_vehicle_cost: Current cost matrix
+        request_vehicle_cost: Current cost matrix, updated in place
         one_solution: Current solution
         already_inserted_request_id: Request ID that was inserted
         noise_func: Optional noise function
@@ -113,7 +120,8 @@ def _update_request_vehicle_cost(meta_obj: Meta, already_inserted_path_vehicle_i
     if already_inserted_request_id not in request_vehicle_cost:
         raise KeyError(f'Request {already_inserted_request_id} does not exist in cost matrix')
     
-    new_request_vehicle_cost = copy.deepcopy(request_vehicle_cost)
+    # Callers always replace their matrix with the returned one, so no copy is needed
+    new_request_vehicle_cost = request_vehicle_cost
     
     # Remove the inserted request
     del new_request_vehicle_cost[already_inserted_request_id]
@@ -123,6 +131,10 @@ def _update_request_vehicle_cost(meta_obj: Meta, already_inserted_path_vehicle_i
         if already_inserted_path_vehicle_id not in vehicle_id_dict:
             raise RuntimeError(f'Vehicle {already_inserted_path_vehicle_id} not found in cost matrix for request {request_id}')
         
+        # Incompatible vehicles keep their unlimited cost
+        if already_inserted_path_vehicle_id not in meta_obj.requests[request_id].vehicle_set:
+            continue
+        
         ok, cost = one_solution.cost_if_insert_request_to_vehicle_path(request_id, already_inserted_path_vehicle_id)
         
         if not ok:
@@ -26,7 +26,7 @@ SOFTWARE.
 
 
 import copy
-from typing import Dict, Optional
+from typing import Dict, Hashable, List, Optional, Tuple
 
 
 from parameters import Parameters
@@ -35,12 +35,53 @@ from request import Request
 from vehicle import Vehicle
 
 
+class VehicleRecord:
+	"""Everything Meta.delete_vehicle drops for one vehicle, returned by Meta.record_vehicle()
+	
+	Holds the vehicle, its two depot nodes and the distance and run time entries of
+	those nodes, O(vehicles * nodes) in size, so that a deletion can be undone with
+	Meta.restore_vehicle() instead of keeping a full copy of the Meta.
+	"""
+	
+	__slots__ = ('vehicle', 'start_node', 'end_node', 'run_time', 'request_ids', 'distance_rows',
+	             'distance_columns', 'run_time_entries')
+	
+	def __init__(self, meta_obj: 'Meta', vehicle_id: int) -> None:
+		self.vehicle = meta_obj.vehicles[vehicle_id]
+		start_node_id = self.vehicle.start_node_id
+		end_node_id = self.vehicle.end_node_id
+		self.start_node = meta_obj.nodes[start_node_id]
+		self.end_node = meta_obj.nodes[end_node_id]
+		# kept without a copy: delete_vehicle drops it, or only its depot entries when another vehicle shares it
+		self.run_time = meta_obj.vehicle_run_between_nodes_time.get(vehicle_id)
+		self.request_ids = [request_id for request_id, one_request in meta_obj.requests.items()
+		                    if vehicle_id in one_request.vehicle_set]
+		
+		# rows lose the two depot entries when they are deleted, the columns keep them
+		self.distance_rows = (meta_obj.distances[start_node_id], meta_obj.distances[end_node_id])
+		self.distance_columns = {from_node_id: (to_node_dict[start_node_id], to_node_dict[end_node_id])
+		                         for from_node_id, to_node_dict in meta_obj.distances.items()}
+		
+		# (run time table of the other vehicles, its two depot rows, its depot columns), like the distances above
+		self.run_time_entries: List[Tuple[Dict[int, Dict[int, float]], Tuple[Dict[int, float], Dict[int, float]],
+		                                  Dict[int, Tuple[float, float]]]] = []
+		for time_dict in meta_obj.distinct_run_time_tables(vehicle_id):
+			columns = {from_node_id: (to_node_dict[start_node_id], to_node_dict[end_node_id])
+			           for from_node_id, to_node_dict in time_dict.items()}
+			self.run_time_entries.append((time_dict, (time_dict[start_node_id], time_dict[end_node_id]), columns))
+
+
 class Meta:
+	# entry cap of the insertion cost cache, see cache_insertion_cost
+	INSERTION_COST_CACHE_SIZE = 100000
+	
 	def __init__(self, parameters: Parameters):
 		# running parameters
 		self.parameters = parameters
 		
-		# first_node_id -> {second_node_id -> distance between them}
+		# first_node_id -> {second_node_id -> distance between them}, symmetric: the packed pair
+		# tables of the Shaw normalization keep only one direction of each pair; the Li & Lim
+		# reader checks it once when it builds the table
 		self.distances: Dict[int, Dict[int, float]] = {}
 		# node_id -> Node
 		self.nodes: Dict[int, Node] = {}
@@ -48,19 +89,119 @@ class Meta:
 		self.requests: Dict[int, Request] = {}
 		# vehicle_id -> Vehicle
 		self.vehicles: Dict[int, Vehicle] = {}
-		# vehicle_id -> {first_node_id -> {second_node_id -> run_time}}
+		# vehicle_id -> {first_node_id -> {second_node_id -> run_time}}, vehicles of the same type
+		# share one table object, see distinct_run_time_tables
 		self.vehicle_run_between_nodes_time: Dict[int, Dict[int, Dict[int, float]]] = {}
+		
+		# dense copy of distances, built on first use, see distance_matrix
+		self._distance_matrix: Optional[List[List[float]]] = None
+		# id of a run time table -> (that table, its dense copy), see run_time_matrix
+		self._run_time_matrices: Dict[int, Tuple[Dict[int, Dict[int, float]], List[List[float]]]] = {}
+		
+		# (route key, request_id) -> (ok, distance_diff, time_diff, pick_insert_idx, delivery_insert_idx)
+		# of an optimal insertion, shared by every solution on this meta, with the hit count of each entry
+		self._insertion_cost_cache: Dict[Tuple[Hashable, int], Tuple[bool, float, float, int, int]] = {}
+		self._insertion_cost_hits: Dict[Tuple[Hashable, int], int] = {}
+	
+	@property
+	def distance_matrix(self) -> List[List[float]]:
+		"""
+		Dense copy of distances: row first_node_id is a list indexed by second_node_id
+		
+		Built lazily and dropped whenever the node set changes. Rows reference the
+		same float objects as distances, so only the row slots cost extra memory.
+		Path uses it for all its distance updates.
+		"""
+		if self._distance_matrix is None:
+			self._distance_matrix = self._dense_matrix(self.distances)
+		return self._distance_matrix
+	
+	def run_time_matrix(self, vehicle_id: int) -> List[List[float]]:
+		"""
+		Dense copy of the run time table of vehicle_id, laid out like distance_matrix
+		
+		Built lazily once per distinct table and dropped together with distance_matrix.
+		"""
+		time_dict = self.vehicle_run_between_nodes_time[vehicle_id]
+		entry = self._run_time_matrices.get(id(time_dict))
+		# the table is kept in the entry, so a matching id cannot belong to a replaced table
+		if entry is None or entry[0] is not time_dict:
+			entry = (time_dict, self._dense_matrix(time_dict))
+			self._run_time_matrices[id(time_dict)] = entry
+		return entry[1]
+	
+	@staticmethod
+	def _dense_matrix(table: Dict[int, Dict[int, float]]) -> List[List[float]]:
+		"""Rows indexed by first node id of lists indexed by second node id, 0.0 for missing pairs"""
+		size = max(table.keys(), default=-1) + 1
+		matrix = []
+		for from_node_id in range(size):
+			row = [0.0] * size
+			for to_node_id, value in table.get(from_node_id, {}).items():
+				row[to_node_id] = value
+			matrix.append(row)
+		return matrix
+	
+	def get_cached_insertion_cost(self, key: Tuple[Hashable, int]) -> Optional[Tuple[bool, float, float, int, int]]:
+		"""Cached optimal insertion result for (route key, request_id), or None if not cached"""
+		result = self._insertion_cost_cache.get(key)
+		if result is not None:
+			self._insertion_cost_hits[key] += 1
+		return result
+	
+	def cache_insertion_cost(self, key: Tuple[Hashable, int], result: Tuple[bool, float, float, int, int]) -> None:
+		"""
+		Cache an optimal insertion result for (route key, request_id)
+		
+		When the cache is full, the least frequently hit half of the entries is evicted
+		in one go, which keeps eviction cost amortized constant per insert.
+		"""
+		if len(self._insertion_cost_cache) >= self.INSERTION_COST_CACHE_SIZE:
+			hits = self._insertion_cost_hits
+			kept_keys = sorted(hits, key=hits.__getitem__, reverse=True)[:self.INSERTION_COST_CACHE_SIZE // 2]
+			self._insertion_cost_cache = {k: self._insertion_cost_cache[k] for k in kept_keys}
+			# older survivors do not keep their advantage forever
+			self._insertion_cost_hits = {k: hits[k] >> 1 for k in kept_keys}
+		self._insertion_cost_cache[key] = result
+		self._insertion_cost_hits[key] = 0
+	
+	def clear_insertion_cost_cache(self) -> None:
+		self._insertion_cost_cache.clear()
+		self._insertion_cost_hits.clear()
+	
+	def __getstate__(self) -> Dict[str, object]:
+		"""Pickle without the derived caches, e.g. for worker processes; they are rebuilt lazily"""
+		state = self.__dict__.copy()
+		state['_distance_matrix'] = None
+		state['_run_time_matrices'] = {}
+		state['_insertion_cost_cache'] = {}
+		state['_insertion_cost_hits'] = {}
+		return state
 	
 	def copy(self):
 		new_meta_obj = Meta(self.parameters)
-		new_meta_obj.distances = copy.deepcopy(self.distances)
+		# nested dicts of floats only need their dict levels copied
+		new_meta_obj.distances = {k: v.copy() for k, v in self.distances.items()}
 		new_meta_obj.nodes = copy.deepcopy(self.nodes)
 		new_meta_obj.requests = copy.deepcopy(self.requests)
 		new_meta_obj.vehicles = copy.deepcopy(self.vehicles)
-		new_meta_obj.vehicle_run_between_nodes_time = copy.deepcopy(self.vehicle_run_between_nodes_time)
+		# each shared run time table is copied once and stays shared in the copy
+		copied_tables: Dict[int, Dict[int, Dict[int, float]]] = {}
+		for vehicle_id, time_dict in self.vehicle_run_between_nodes_time.items():
+			if id(time_dict) not in copied_tables:
+				copied_tables[id(time_dict)] = {k: v.copy() for k, v in time_dict.items()}
+			new_meta_obj.vehicle_run_between_nodes_time[vehicle_id] = copied_tables[id(time_dict)]
 		
 		return new_meta_obj
 
+	def distinct_run_time_tables(self, excluded_vehicle_id: Optional[int] = None) -> List[Dict[int, Dict[int, float]]]:
+		"""Run time tables of all vehicles except excluded_vehicle_id, each shared table only once"""
+		tables = {}
+		for vehicle_id, time_dict in self.vehicle_run_between_nodes_time.items():
+			if vehicle_id != excluded_vehicle_id:
+				tables[id(time_dict)] = time_dict
+		return list(tables.values())
+	
 	# this interface only use for problems with homogeneous fleet
 	def add_one_same_vehicle(self, new_vehicle_id: Optional[int] = None) -> int :
 		if len(self.vehicles) == 0:
@@ -94,39 +235,47 @@ class Meta:
 			new_vehicle_end_node_id
 		)
 		
-		# Initialize vehicle_run_between_nodes_time for the new vehicle
-		self.vehicle_run_between_nodes_time[new_vehicle_id] = {}
-		for from_node_id in self.nodes.keys():
-			self.vehicle_run_between_nodes_time[new_vehicle_id][from_node_id] = {}
-			for to_node_id in self.nodes.keys():
-				if from_node_id == to_node_id:
-					self.vehicle_run_between_nodes_time[new_vehicle_id][from_node_id][to_node_id] = 0.0
-				else:
-					# Calculate travel time = distance / speed
-					distance = self.distances.get(from_node_id, {}).get(to_node_id, 0.0)
-					travel_time = distance / reference_vehicle.velocity if reference_vehicle.velocity > 0 else distance
-					self.vehicle_run_between_nodes_time[new_vehicle_id][from_node_id][to_node_id] = travel_time
+		# Initialize vehicle_run_between_nodes_time for the new vehicle: it runs like the reference
+		# vehicle, so it shares its table, which gets the new depot nodes with all other tables below
+		reference_run_time = self.vehicle_run_between_nodes_time.get(reference_vehicle.identity)
+		if reference_run_time is not None:
+			self.vehicle_run_between_nodes_time[new_vehicle_id] = reference_run_time
+		else:
+			self.vehicle_run_between_nodes_time[new_vehicle_id] = {}
+			for from_node_id in self.nodes.keys():
+				self.vehicle_run_between_nodes_time[new_vehicle_id][from_node_id] = {}
+				for to_node_id in self.nodes.keys():
+					if from_node_id == to_node_id:
+						self.vehicle_run_between_nodes_time[new_vehicle_id][from_node_id][to_node_id] = 0.0
+					else:
+						# Calculate travel time = distance / speed
+						distance = self.distances.get(from_node_id, {}).get(to_node_id, 0.0)
+						travel_time = distance / reference_vehicle.velocity if reference_vehicle.velocity > 0 else distance
+						self.vehicle_run_between_nodes_time[new_vehicle_id][from_node_id][to_node_id] = travel_time
 		
 		# Add the new vehicle to all requests
 		for one_request in self.requests.values():
-			one_request.vehicle_set.add(new_vehicle_id)
+			one_request.add_vehicle(new_vehicle_id)
 			
 		# Update distances
+		self._distance_matrix = None
+		self._run_time_matrices.clear()
+		self.clear_insertion_cost_cache()
 		random_depot_node_id = random_depot_node.node_id
 		for from_node_id, to_node_dict in self.distances.items():
 			to_node_dict[new_vehicle_start_node_id] = to_node_dict[random_depot_node_id]
 			to_node_dict[new_vehicle_end_node_id] = to_node_dict[random_depot_node_id]
-		self.distances[new_vehicle_start_node_id] = copy.deepcopy(self.distances[random_depot_node_id])
+		self.distances[new_vehicle_start_node_id] = self.distances[random_depot_node_id].copy()
 		self.distances[new_vehicle_start_node_id][new_vehicle_end_node_id] = 0.0
-		self.distances[new_vehicle_end_node_id] = copy.deepcopy(self.distances[random_depot_node_id])
+		self.distances[new_vehicle_end_node_id] = self.distances[random_depot_node_id].copy()
 		self.distances[new_vehicle_end_node_id][new_vehicle_start_node_id] = 0.0
 		
-		for vehicle_id, time_dict in self.vehicle_run_between_nodes_time.items():
+		for time_dict in self.distinct_run_time_tables():
 			for from_node_id, to_node_dict in time_dict.items():
 				to_node_dict[new_vehicle_start_node_id] = to_node_dict[random_depot_node_id]
 				to_node_dict[new_vehicle_end_node_id] = to_node_dict[random_depot_node_id]
-			time_dict[new_vehicle_start_node_id] = copy.deepcopy(time_dict[random_depot_node_id])
-			time_dict[new_vehicle_end_node_id] = copy.deepcopy(time_dict[random_depot_node_id])
+			time_dict[new_vehicle_start_node_id] = time_dict[random_depot_node_id].copy()
+			time_dict[new_vehicle_end_node_id] = time_dict[random_depot_node_id].copy()
 			time_dict[new_vehicle_start_node_id][new_vehicle_end_node_id] = 0.0
 			time_dict[new_vehicle_end_node_id][new_vehicle_start_node_id] = 0.0
 
@@ -156,7 +305,7 @@ class Meta:
 		# Delete the vehicle from the Meta structure
 		del self.vehicles[deleted_vehicle_id]
 		
-		# Delete from vehicle run time data
+		# Delete from vehicle run time data, a table shared with other vehicles only loses the depot entries below
 		if deleted_vehicle_id in self.vehicle_run_between_nodes_time:
 			del self.vehicle_run_between_nodes_time[deleted_vehicle_id]
 		
@@ -165,7 +314,7 @@ class Meta:
 		del self.nodes[end_depot_node_id]
 		
 		# Delete from all time dictionaries
-		for vehicle_id, time_dict in self.vehicle_run_between_nodes_time.items():
+		for time_dict in self.distinct_run_time_tables():
 			for from_node_id, to_node_id_dict in time_dict.items():
 				del to_node_id_dict[start_depot_node_id]
 				del to_node_id_dict[end_depot_node_id]
@@ -174,9 +323,12 @@ class Meta:
 
 		# Remove vehicle from all requests
 		for one_request in self.requests.values():
-			one_request.vehicle_set.discard(deleted_vehicle_id)  # discard() won't raise KeyError
+			one_request.discard_vehicle(deleted_vehicle_id)  # discard() won't raise KeyError
 		
 		# Delete from distances
+		self._distance_matrix = None
+		self._run_time_matrices.clear()
+		self.clear_insertion_cost_cache()
 		for from_node_id, node_id_dict in self.distances.items():
 			del node_id_dict[start_depot_node_id]
 			del node_id_dict[end_depot_node_id]
@@ -185,6 +337,50 @@ class Meta:
 
 		return True  # Return True to indicate successful deletion
 	
+	def record_vehicle(self, vehicle_id: int) -> VehicleRecord:
+		"""Record a vehicle before delete_vehicle, so that restore_vehicle can undo the deletion"""
+		if vehicle_id not in self.vehicles:
+			raise ValueError(f"Vehicle {vehicle_id} not found")
+		return VehicleRecord(self, vehicle_id)
+	
+	def restore_vehicle(self, record: VehicleRecord) -> None:
+		"""
+		Undo delete_vehicle with the record taken right before it
+		
+		No other vehicle may be added or deleted in between.
+		"""
+		vehicle_id = record.vehicle.identity
+		if vehicle_id in self.vehicles:
+			raise ValueError(f"Vehicle {vehicle_id} already exists!")
+		start_node_id = record.start_node.node_id
+		end_node_id = record.end_node.node_id
+		
+		self.vehicles[vehicle_id] = record.vehicle
+		self.nodes[start_node_id] = record.start_node
+		self.nodes[end_node_id] = record.end_node
+		
+		if record.run_time is not None:
+			self.vehicle_run_between_nodes_time[vehicle_id] = record.run_time
+		for time_dict, (start_row, end_row), columns in record.run_time_entries:
+			time_dict[start_node_id] = start_row
+			time_dict[end_node_id] = end_row
+			for from_node_id, (to_start, to_end) in columns.items():
+				to_node_dict = time_dict[from_node_id]
+				to_node_dict[start_node_id] = to_start
+				to_node_dict[end_node_id] = to_end
+		
+		for request_id in record.request_ids:
+			self.requests[request_id].add_vehicle(vehicle_id)
+		
+		self._distance_matrix = None
+		self._run_time_matrices.clear()
+		self.clear_insertion_cost_cache()
+		self.distances[start_node_id], self.distances[end_node_id] = record.distance_rows
+		for from_node_id, (to_start, to_end) in record.distance_columns.items():
+			to_node_dict = self.distances[from_node_id]
+			to_node_dict[start_node_id] = to_start
+			to_node_dict[end_node_id] = to_end
+	
 	def get_max_distance(self) -> Optional[float]:
 		if not self.distances:
 			return None
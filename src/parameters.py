@@ -28,7 +28,8 @@ SOFTWARE.
 import copy
 import json
 import random
-from typing import Dict, Any, List, Optional, Union
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional, Union
 
 
 class ParameterRange:
@@ -224,6 +225,17 @@ class Parameters:
         self._performance_history.clear()
         self._best_performance = None
     
+    @contextmanager
+    def override(self, **kwargs: Any) -> Iterator['Parameters']:
+        """Temporarily apply parameter values, restoring only those parameters on exit"""
+        saved_params = {name: self._params[name] for name in kwargs if name in self._params}
+        try:
+            # inside the try: a value failing validation must not leave the earlier ones applied
+            self.apply_parameters(kwargs)
+            yield self
+        finally:
+            self._params.update(saved_params)
+    
     def get_parameter_info(self, param_name: str) -> Optional[Dict[str, Any]]:
         """Get detailed information about a parameter"""
         if param_name not in self.PARAMETER_RANGES:
@@ -378,8 +390,10 @@ class Parameters:
     
     def __getattr__(self, name: str) -> Any:
         """Get parameter value by attribute access"""
-        if name in self._params:
-            return self._params[name]
+        # read _params through __dict__: it is not set yet while unpickling or copying
+        params = self.__dict__.get("_params")
+        if params is not None and name in params:
+            return params[name]
         raise AttributeError(f"'Parameters' object has no attribute '{name}'")
 
     def __setattr__(self, name: str, value: Any) -> None:
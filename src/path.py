@@ -26,6 +26,8 @@ SOFTWARE.
 
 
 from __future__ import annotations
+import hashlib
+from array import array
 from typing import List, Tuple, Optional
 from meta import Meta
 
@@ -45,18 +47,18 @@ class Path:
 			if vehicle_id not in self.meta_obj.vehicles:
 				raise PathError(f"Vehicle {vehicle_id} not found in meta_obj")
 			
-			# node id route
+			# node id route, packed as int32 so copies and hashing work on the raw buffer
 			start_node_id = self.meta_obj.vehicles[self.vehicle_id].start_node_id
 			end_node_id = self.meta_obj.vehicles[self.vehicle_id].end_node_id
 			
 			if start_node_id not in self.meta_obj.nodes or end_node_id not in self.meta_obj.nodes:
 				raise PathError(f"Vehicle {vehicle_id} nodes not found: start={start_node_id}, end={end_node_id}")
 			
-			self.route: List[int] = [start_node_id, end_node_id]
+			self.route: array = array('i', (start_node_id, end_node_id))
 			
 			# start the service time along the node route
 			earliest_time = self.meta_obj.nodes[start_node_id].earliest_service_time
-			arrival_time = earliest_time + self.meta_obj.nodes[start_node_id].service_time + self.meta_obj.vehicle_run_between_nodes_time[self.vehicle_id][start_node_id][end_node_id]
+			arrival_time = earliest_time + self.meta_obj.nodes[start_node_id].service_time + self.meta_obj.run_time_matrix(self.vehicle_id)[start_node_id][end_node_id]
 			latest_time = max(arrival_time, self.meta_obj.nodes[end_node_id].earliest_service_time)
 			
 			if latest_time > self.meta_obj.nodes[end_node_id].latest_service_time:
@@ -70,20 +72,33 @@ class Path:
 			                  self.meta_obj.nodes[start_node_id].load + self.meta_obj.nodes[end_node_id].load]
 			
 			# distance accumulated
-			end_distance = self.meta_obj.distances[start_node_id][end_node_id]
+			end_distance = self.meta_obj.distance_matrix[start_node_id][end_node_id]
 			self.distances: List[float] = [0, end_distance]
+		
+		# digest of vehicle id and route, see route_digest
+		self._route_digest: Optional[bytes] = None
 			
 	def copy(self):
 		new_path = Path(self.vehicle_id, self.meta_obj, False)
 		new_path.meta_obj = self.meta_obj
 		new_path.vehicle_id = self.vehicle_id
-		new_path.route = self.route.copy()
+		new_path.route = self.route[:]
 		new_path.start_service_time_line = self.start_service_time_line.copy()
 		new_path.load_line = self.load_line.copy()
 		new_path.distances = self.distances.copy()
+		new_path._route_digest = self._route_digest
 		
 		return new_path
 	
+	def route_digest(self) -> bytes:
+		"""Digest of the vehicle id and route, recomputed only after the route changed"""
+		if self._route_digest is None:
+			hasher = hashlib.blake2b(digest_size=16)
+			hasher.update(self.vehicle_id.to_bytes(4, 'little'))
+			hasher.update(self.route.tobytes())
+			self._route_digest = hasher.digest()
+		return self._route_digest
+	
 	def is_path_free(self):
 		return len(self.route) <= 2
 	
@@ -97,36 +112,42 @@ class Path:
 
 	def _update_service_times_after_insertion(self, start_idx: int) -> bool:
 		"""Update service times after inserting nodes at start_idx"""
+		nodes = self.meta_obj.nodes
+		run_time = self.meta_obj.run_time_matrix(self.vehicle_id)
 		for i in range(start_idx, len(self.start_service_time_line)):
 			prev_node_id = self.route[i - 1]
 			current_node_id = self.route[i]
+			current_node = nodes[current_node_id]
 			new_start_time = max(self.start_service_time_line[i - 1] +
-							    self.meta_obj.nodes[prev_node_id].service_time +
-			                    self.meta_obj.vehicle_run_between_nodes_time[self.vehicle_id][prev_node_id][current_node_id],
-			                    self.meta_obj.nodes[current_node_id].earliest_service_time)
+			                     nodes[prev_node_id].service_time +
+			                     run_time[prev_node_id][current_node_id],
+			                     current_node.earliest_service_time)
 			
-			if new_start_time > self.meta_obj.nodes[current_node_id].latest_service_time:
+			if new_start_time > current_node.latest_service_time:
 				return False
 			self.start_service_time_line[i] = new_start_time
 		return True
 
 	def _update_loads_after_insertion(self, pick_idx: int, delivery_idx: int) -> bool:
 		"""Update loads after inserting pickup and delivery nodes"""
+		nodes = self.meta_obj.nodes
+		capacity = self.meta_obj.vehicles[self.vehicle_id].capacity
 		for i in range(pick_idx, delivery_idx + 1):
 			current_node_id = self.route[i]
-			new_load = self.load_line[i - 1] + self.meta_obj.nodes[current_node_id].load
-			if new_load > self.meta_obj.vehicles[self.vehicle_id].capacity:
+			new_load = self.load_line[i - 1] + nodes[current_node_id].load
+			if new_load > capacity:
 				return False
 			self.load_line[i] = new_load
 		return True
 
 	def _update_distances_after_insertion(self, start_idx: int):
 		"""Update distances after inserting nodes at start_idx"""
+		distance_matrix = self.meta_obj.distance_matrix
 		for i in range(start_idx, len(self.distances)):
 			prev_node_id = self.route[i - 1]
 			current_node_id = self.route[i]
 			current_distance = self.distances[i - 1] + \
-							   self.meta_obj.distances[prev_node_id][current_node_id]
+							   distance_matrix[prev_node_id][current_node_id]
 			self.distances[i] = current_distance
 
 	def try_to_insert_request(self, request_id: int, pick_insert_idx: int, delivery_insert_idx: int) -> Tuple[bool, float, float]:
@@ -138,6 +159,7 @@ class Path:
 		delivery_node_id = self.meta_obj.requests[request_id].delivery_node_id
 		
 		# Insert nodes
+		self._route_digest = None
 		self.route.insert(pick_insert_idx, pick_node_id)
 		self.route.insert(delivery_insert_idx, delivery_node_id)
 		
@@ -204,18 +226,18 @@ class Path:
 	
 	def _update_service_times_after_removal(self, start_idx: int) -> bool:
 		"""Update service times after removing nodes"""
+		nodes = self.meta_obj.nodes
+		run_time = self.meta_obj.run_time_matrix(self.vehicle_id)
 		for i in range(start_idx, len(self.start_service_time_line)):
 			prev_node_id = self.route[i - 1]
 			current_node_id = self.route[i]
-			
-			
-			
+			current_node = nodes[current_node_id]
 			new_start_time = max(self.start_service_time_line[i - 1] +
-			                     self.meta_obj.nodes[prev_node_id].service_time +
-			                     self.meta_obj.vehicle_run_between_nodes_time[self.vehicle_id][prev_node_id][current_node_id],
-			                     self.meta_obj.nodes[current_node_id].earliest_service_time)
+			                     nodes[prev_node_id].service_time +
+			                     run_time[prev_node_id][current_node_id],
+			                     current_node.earliest_service_time)
 			
-			if new_start_time > self.meta_obj.nodes[current_node_id].latest_service_time:
+			if new_start_time > current_node.latest_service_time:
 				return False
 			self.start_service_time_line[i] = new_start_time
 		return True
@@ -224,21 +246,24 @@ class Path:
 		"""Update loads after removing pickup and delivery nodes"""
 		# Only update loads between pickup and delivery if there are nodes in between
 		if pick_idx < delivery_idx - 1:
+			nodes = self.meta_obj.nodes
+			capacity = self.meta_obj.vehicles[self.vehicle_id].capacity
 			for i in range(pick_idx, delivery_idx - 1):
 				current_node_id = self.route[i]
-				new_load = self.load_line[i - 1] + self.meta_obj.nodes[current_node_id].load
-				if new_load > self.meta_obj.vehicles[self.vehicle_id].capacity:
+				new_load = self.load_line[i - 1] + nodes[current_node_id].load
+				if new_load > capacity:
 					return False
 				self.load_line[i] = new_load
 		return True
 
 	def _update_distances_after_removal(self, start_idx: int):
 		"""Update distances after removing nodes"""
+		distance_matrix = self.meta_obj.distance_matrix
 		for i in range(start_idx, len(self.distances)):
 			prev_node_id = self.route[i - 1]
 			current_node_id = self.route[i]
 			current_distance = self.distances[i - 1] + \
-			                   self.meta_obj.distances[prev_node_id][current_node_id]
+			                   distance_matrix[prev_node_id][current_node_id]
 			self.distances[i] = current_distance
 
 	def try_to_remove_request(self, request_id: int) -> Tuple[float, float]:
@@ -256,6 +281,7 @@ class Path:
 			raise PathError(f"Invalid node indices: pick={pick_node_idx}, delivery={delivery_node_idx}")
 
 		# Remove nodes
+		self._route_digest = None
 		self.route.pop(pick_node_idx)
 		self.route.pop(delivery_node_idx - 1)  # Adjust index after first removal
 
@@ -288,6 +314,61 @@ class Path:
 
 		return distance_diff, time_cost_diff
 
+	def delta_if_remove_request(self, request_id: int) -> Tuple[float, float]:
+		"""Distance and time cost reductions of removing a request, without changing the path
+		
+		Returns the same values as try_to_remove_request. The distance change only
+		involves the edges around the two removed nodes; start times are replayed from
+		the pickup position until they meet the current ones again.
+		"""
+		if self.vehicle_id not in self.meta_obj.requests[request_id].vehicle_set:
+			raise PathError(f"Vehicle {self.vehicle_id} not in request {request_id} vehicle set")
+		
+		route = self.route
+		pick_node_id = self.meta_obj.requests[request_id].pick_node_id
+		delivery_node_id = self.meta_obj.requests[request_id].delivery_node_id
+		pick_node_idx = route.index(pick_node_id)
+		delivery_node_idx = route.index(delivery_node_id)
+		
+		if pick_node_idx <= 0 or delivery_node_idx <= 0:
+			raise PathError(f"Invalid node indices: pick={pick_node_idx}, delivery={delivery_node_idx}")
+		
+		distances = self.meta_obj.distance_matrix
+		before_pick = route[pick_node_idx - 1]
+		after_delivery = route[delivery_node_idx + 1]
+		if delivery_node_idx == pick_node_idx + 1:
+			distance_diff = (distances[before_pick][pick_node_id] + distances[pick_node_id][delivery_node_id] +
+			                 distances[delivery_node_id][after_delivery] - distances[before_pick][after_delivery])
+		else:
+			after_pick = route[pick_node_idx + 1]
+			before_delivery = route[delivery_node_idx - 1]
+			distance_diff = (distances[before_pick][pick_node_id] + distances[pick_node_id][after_pick] -
+			                 distances[before_pick][after_pick] +
+			                 distances[before_delivery][delivery_node_id] + distances[delivery_node_id][after_delivery] -
+			                 distances[before_delivery][after_delivery])
+		
+		nodes = self.meta_obj.nodes
+		run_time = self.meta_obj.run_time_matrix(self.vehicle_id)
+		start_service_time_line = self.start_service_time_line
+		prev_node_id = before_pick
+		prev_start_time = start_service_time_line[pick_node_idx - 1]
+		for i in range(pick_node_idx + 1, len(route)):
+			if i == delivery_node_idx:
+				continue
+			current_node_id = route[i]
+			current_node = nodes[current_node_id]
+			new_start_time = max(prev_start_time + nodes[prev_node_id].service_time + run_time[prev_node_id][current_node_id],
+			                     current_node.earliest_service_time)
+			if new_start_time > current_node.latest_service_time:
+				raise PathError("Time window violation after removal")
+			if i > delivery_node_idx and new_start_time == start_service_time_line[i]:
+				# the rest of the route keeps its current start times
+				return distance_diff, 0.0
+			prev_node_id = current_node_id
+			prev_start_time = new_start_time
+		
+		return distance_diff, start_service_time_line[-1] - prev_start_time
+	
 	def get_node_start_service_time(self, node_id: int) -> float:
 		"""Get the start service time for a specific node"""
 		if node_id not in self.route:
@@ -25,7 +25,7 @@ SOFTWARE.
 """
 
 
-from typing import Set, List, Callable, Tuple
+from typing import Set, Callable
 from meta import Meta
 from solution import PDWTWSolution, InnerDictForNormalization, generate_normalization_dict
 import random
@@ -43,28 +43,35 @@ def big_r_function(meta_obj: Meta, base_request_id: int, norm_obj: InnerDictForN
     Returns:
         A function that takes another request ID and returns relatedness score
     """
+    # Bind the measure arrays and Shaw weights once, the closure is called for every pair while sorting
+    distance_pick = norm_obj.distance_pick
+    distance_delivery = norm_obj.distance_delivery
+    start_time_diff_pick = norm_obj.start_time_diff_pick
+    start_time_diff_delivery = norm_obj.start_time_diff_delivery
+    load_diff = norm_obj.load_diff
+    vehicle_set_diff = norm_obj.vehicle_set_diff
+    shaw_param_1 = meta_obj.parameters.shaw_param_1
+    shaw_param_2 = meta_obj.parameters.shaw_param_2
+    shaw_param_3 = meta_obj.parameters.shaw_param_3
+    shaw_param_4 = meta_obj.parameters.shaw_param_4
+    pair_offset = norm_obj.pair_offset
+    
     def _calculate_relatedness(another_request_id: int) -> float:
         """Calculate relatedness between base_request_id and another_request_id"""
-        # Ensure consistent ordering for dictionary access
-        if base_request_id > another_request_id:
-            first_id, second_id = another_request_id, base_request_id
-        else:
-            first_id, second_id = base_request_id, another_request_id
+        offset = pair_offset(base_request_id, another_request_id)
         
         # Calculate relatedness using Shaw's parameters
-        distance_score = (norm_obj.distance_pick_dict[first_id][second_id] + 
-                         norm_obj.distance_delivery_dict[first_id][second_id])
+        distance_score = distance_pick[offset] + distance_delivery[offset]
         
-        time_score = (norm_obj.start_time_diff_pick_dict[first_id][second_id] + 
-                     norm_obj.start_time_diff_delivery_dict[first_id][second_id])
+        time_score = start_time_diff_pick[offset] + start_time_diff_delivery[offset]
         
-        load_score = norm_obj.load_diff_dict[first_id][second_id]
-        vehicle_score = norm_obj.vehicle_set_diff_dict[first_id][second_id]
+        load_score = load_diff[offset]
+        vehicle_score = vehicle_set_diff[offset]
         
-        return (meta_obj.parameters.shaw_param_1 * distance_score +
-                meta_obj.parameters.shaw_param_2 * time_score +
-                meta_obj.parameters.shaw_param_3 * load_score +
-                meta_obj.parameters.shaw_param_4 * vehicle_score)
+        return (shaw_param_1 * distance_score +
+                shaw_param_2 * time_score +
+                shaw_param_3 * load_score +
+                shaw_param_4 * vehicle_score)
     
     return _calculate_relatedness
 
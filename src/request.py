@@ -25,13 +25,40 @@ SOFTWARE.
 """
 
 
-from typing import Set
+from typing import Iterable, Optional, Set
+
+
+def vehicle_mask_of(vehicle_ids: Iterable[int]) -> int:
+	"""Build a bitmask with bit ``vehicle_id`` set for every given vehicle id"""
+	mask = 0
+	for vehicle_id in vehicle_ids:
+		mask |= 1 << vehicle_id
+	return mask
+
+
+try:
+	popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+	def popcount(mask: int) -> int:
+		return bin(mask).count('1')
+
 
 class Request:
-	def __init__(self, identity: int, pickup_node_id: int, delivery_node_id: int, require_capacity: float, vehicle_set: Set[int]):
+	def __init__(self, identity: int, pickup_node_id: int, delivery_node_id: int, require_capacity: float, vehicle_set: Set[int],
+	             vehicle_mask: Optional[int] = None):
 		self.identity: int = identity
 		self.pick_node_id: int = pickup_node_id
 		self.delivery_node_id: int = delivery_node_id
 		self.require_capacity: float = require_capacity
 		self.vehicle_set: Set[int] = vehicle_set
-	
\ No newline at end of file
+		# same content as vehicle_set, as a bitmask indexed by vehicle id;
+		# callers building many requests over one vehicle set can pass it precomputed
+		self.vehicle_mask: int = vehicle_mask_of(vehicle_set) if vehicle_mask is None else vehicle_mask
+	
+	def add_vehicle(self, vehicle_id: int) -> None:
+		self.vehicle_set.add(vehicle_id)
+		self.vehicle_mask |= 1 << vehicle_id
+	
+	def discard_vehicle(self, vehicle_id: int) -> None:
+		self.vehicle_set.discard(vehicle_id)
+		self.vehicle_mask &= ~(1 << vehicle_id)
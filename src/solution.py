@@ -28,79 +28,145 @@ SOFTWARE.
 from __future__ import annotations
 
 import abc
-import copy
 import hashlib
 from abc import ABC
-from typing import Dict
+from array import array
+from bisect import insort
+from typing import Dict, List, Optional, Set, Tuple
 from meta import Meta
 from path import Path
+from request import popcount
 
 
 class InnerDictForNormalization:
-	"""Container for normalized difference values between requests"""
+	"""Container for normalized difference values between requests
+	
+	Every measure is kept as a packed upper-triangular array of doubles: rows are
+	indexed by the position of a request in the sorted request id list, and the
+	value of the pair (i, j) with i < j lives at offset ``row_base[i] + j``.
+	"""
+	
+	__slots__ = ('index_of', 'row_base', 'distance_pick', 'distance_delivery', 'start_time_diff_pick',
+	             'start_time_diff_delivery', 'load_diff', 'vehicle_set_diff')
 	
 	def __init__(self) -> None:
-		# smaller request_id -> {bigger request_id -> normalized value}
-		self.distance_pick_dict: Dict[int, Dict[int, float]] = {}
-		self.distance_delivery_dict: Dict[int, Dict[int, float]] = {}
-		self.start_time_diff_pick_dict: Dict[int, Dict[int, float]] = {}
-		self.start_time_diff_delivery_dict: Dict[int, Dict[int, float]] = {}
-		self.load_diff_dict: Dict[int, Dict[int, float]] = {}
-		self.vehicle_set_diff_dict: Dict[int, Dict[int, float]] = {}
+		# request_id -> row index
+		self.index_of: Dict[int, int] = {}
+		# row index -> offset of the row inside the packed arrays, minus (row index + 1)
+		self.row_base: List[int] = []
+		
+		self.distance_pick: array = array('d')
+		self.distance_delivery: array = array('d')
+		self.start_time_diff_pick: array = array('d')
+		self.start_time_diff_delivery: array = array('d')
+		self.load_diff: array = array('d')
+		self.vehicle_set_diff: array = array('d')
+	
+	def set_request_ids(self, sorted_request_ids: List[int]) -> None:
+		"""Build the request id -> row index map and the packed row offsets"""
+		n = len(sorted_request_ids)
+		self.index_of = {request_id: i for i, request_id in enumerate(sorted_request_ids)}
+		self.row_base = [i * (2 * n - i - 1) // 2 - i - 1 for i in range(n)]
+	
+	def pair_offset(self, request_id_a: int, request_id_b: int) -> int:
+		"""Get the packed offset of the pair of two different requests, in any order"""
+		i = self.index_of[request_id_a]
+		j = self.index_of[request_id_b]
+		if i > j:
+			i, j = j, i
+		return self.row_base[i] + j
 	
 	def copy(self) -> InnerDictForNormalization:
 		new_obj = InnerDictForNormalization()
 		
-		# Use shallow copy for better performance since values are immutable
-		new_obj.distance_pick_dict = {k: v.copy() for k, v in self.distance_pick_dict.items()}
-		new_obj.distance_delivery_dict = {k: v.copy() for k, v in self.distance_delivery_dict.items()}
-		new_obj.start_time_diff_pick_dict = {k: v.copy() for k, v in self.start_time_diff_pick_dict.items()}
-		new_obj.start_time_diff_delivery_dict = {k: v.copy() for k, v in self.start_time_diff_delivery_dict.items()}
-		new_obj.load_diff_dict = {k: v.copy() for k, v in self.load_diff_dict.items()}
-		new_obj.vehicle_set_diff_dict = {k: v.copy() for k, v in self.vehicle_set_diff_dict.items()}
+		# index data is never mutated in place, so it can be shared
+		new_obj.index_of = self.index_of
+		new_obj.row_base = self.row_base
+		
+		new_obj.distance_pick = array('d', self.distance_pick)
+		new_obj.distance_delivery = array('d', self.distance_delivery)
+		new_obj.start_time_diff_pick = array('d', self.start_time_diff_pick)
+		new_obj.start_time_diff_delivery = array('d', self.start_time_diff_delivery)
+		new_obj.load_diff = array('d', self.load_diff)
+		new_obj.vehicle_set_diff = array('d', self.vehicle_set_diff)
 		
 		return new_obj
 
 
-def _normalize_dict(nested_dict: Dict, epsilon: float = 1e-6) -> Dict:
+def _normalize_array(values: List[float], epsilon: float = 1e-6) -> array:
 	"""
-	Normalize values in a nested dictionary to [0, 1] range
+	Normalize values to [0, 1] range into a packed array
 	
 	Args:
-		nested_dict: Dictionary to normalize
+		values: Values to normalize
 		epsilon: Threshold for considering values equal
 		
 	Returns:
-		Normalized dictionary with values in [0, 1] range
+		Normalized array with values in [0, 1] range
 	"""
-	all_values = []
-	for outer_key, inner_dict in nested_dict.items():
-		for inner_key, value in inner_dict.items():
-			all_values.append(value)
-	
-	if not all_values:
-		return nested_dict
+	if not values:
+		return array('d')
 	
-	min_value = min(all_values)
-	max_value = max(all_values)
+	min_value = min(values)
+	max_value = max(values)
 	
 	if abs(max_value - min_value) < epsilon:
-		normalized_dict = {}
-		for outer_key, inner_dict in nested_dict.items():
-			normalized_inner_dict = {}
-			for inner_key, value in inner_dict.items():
-				normalized_inner_dict[inner_key] = 0.0  # All values normalized to 0.0
-			normalized_dict[outer_key] = normalized_inner_dict
-	else:
-		normalized_dict = {}
-		for outer_key, inner_dict in nested_dict.items():
-			normalized_inner_dict = {}
-			for inner_key, value in inner_dict.items():
-				normalized_value = (value - min_value) / (max_value - min_value)
-				normalized_inner_dict[inner_key] = normalized_value
-			normalized_dict[outer_key] = normalized_inner_dict
-	
-	return normalized_dict
+		# All values normalized to 0.0
+		return array('d', bytes(len(values) * array('d').itemsize))
+	
+	# one division for the whole array, then a single scaling pass straight into the packed buffer
+	scale = 1.0 / (max_value - min_value)
+	return array('d', [(value - min_value) * scale for value in values])
+
+
+def _fill_pair_rows(pick_nodes: List[int], delivery_nodes: List[int], pick_times: List[float],
+                    delivery_times: List[float], capacities: List[float], vehicle_masks: List[int],
+                    vehicle_counts: List[int], distances: List[List[float]]):
+	"""
+	Raw pairwise differences for every request pair i < j in packed upper-triangular order
+	
+	Works on plain per-request lists and the dense distance matrix only, without
+	touching Meta or the solution.
+	
+	Returns:
+		Lists distance_pick, distance_delivery, start_time_diff_pick,
+		start_time_diff_delivery, load_diff and vehicle_set_diff
+	"""
+	distance_pick = []
+	distance_delivery = []
+	start_time_diff_pick = []
+	start_time_diff_delivery = []
+	load_diff = []
+	vehicle_set_diff = []
+	n_requests = len(pick_nodes)
+	
+	# pairs are appended row by row, which is exactly the packed upper-triangular layout;
+	# each row is produced by whole-row comprehensions instead of a per-pair Python loop;
+	# fusing all measures into one per-pair loop measured no faster, since the row slices
+	# are cheap copies and the per-pair interpreter work is the same either way
+	for i in range(n_requests):
+		# everything about request i is fixed for the whole row
+		pick_distances_i = distances[pick_nodes[i]]
+		delivery_distances_i = distances[delivery_nodes[i]]
+		pick_time_i = pick_times[i]
+		delivery_time_i = delivery_times[i]
+		capacity_i = capacities[i]
+		vehicle_mask_i = vehicle_masks[i]
+		vehicle_count_i = vehicle_counts[i]
+		rest = slice(i + 1, n_requests)
+		
+		distance_pick.extend(map(pick_distances_i.__getitem__, pick_nodes[rest]))
+		distance_delivery.extend(map(delivery_distances_i.__getitem__, delivery_nodes[rest]))
+		
+		start_time_diff_pick.extend([abs(pick_time_i - t) for t in pick_times[rest]])
+		start_time_diff_delivery.extend([abs(delivery_time_i - t) for t in delivery_times[rest]])
+		
+		load_diff.extend([abs(capacity_i - c) for c in capacities[rest]])
+		
+		vehicle_set_diff.extend([1 - popcount(vehicle_mask_i & mask) / (count if count < vehicle_count_i else vehicle_count_i)
+		                         for mask, count in zip(vehicle_masks[rest], vehicle_counts[rest])])
+	
+	return distance_pick, distance_delivery, start_time_diff_pick, start_time_diff_delivery, load_diff, vehicle_set_diff
 
 
 def generate_normalization_dict(meta_obj: Meta, one_solution: PDWTWSolution) -> InnerDictForNormalization:
@@ -114,86 +180,57 @@ def generate_normalization_dict(meta_obj: Meta, one_solution: PDWTWSolution) ->
 	Returns:
 		Normalized difference values container
 	"""
-	# init difference's dict
-	distance_pic_dict = {}
-	distance_delivery_dict = {}
-	start_time_diff_pick_dict = {}
-	start_time_diff_delivery_dict = {}
-	load_diff_dict = {}
-	vehicle_set_diff = {}
-	
-	request_id_list = sorted(one_solution.request_id_to_vehicle_id.keys())
-	n_requests = len(request_id_list)
+	request_id_list = one_solution.sorted_request_ids
 	
 	# Pre-fetch commonly accessed data to avoid repeated lookups
 	requests = meta_obj.requests
-	distances = meta_obj.distances
-	
-	# Cache node IDs and service times for each request
-	request_data = {}
-	for req_id in request_id_list:
-		req = requests[req_id]
-		pick_node = req.pick_node_id
-		delivery_node = req.delivery_node_id
-		request_data[req_id] = {
-			'pick_node': pick_node,
-			'delivery_node': delivery_node,
-			'pick_time': one_solution.get_node_start_service_time_in_path(pick_node),
-			'delivery_time': one_solution.get_node_start_service_time_in_path(delivery_node),
-			'capacity': req.require_capacity,
-			'vehicle_set': req.vehicle_set
-		}
-	
-	for i in range(n_requests):
-		req_i = request_id_list[i]
-		data_i = request_data[req_i]
-		
-		distance_pic_dict[req_i] = {}
-		distance_delivery_dict[req_i] = {}
-		start_time_diff_pick_dict[req_i] = {}
-		start_time_diff_delivery_dict[req_i] = {}
-		load_diff_dict[req_i] = {}
-		vehicle_set_diff[req_i] = {}
-		
-		for j in range(i + 1, n_requests):
-			req_j = request_id_list[j]
-			data_j = request_data[req_j]
-			
-			# update dicts
-			distance_pic_dict[req_i][req_j] = distances[data_i['pick_node']][data_j['pick_node']]
-			distance_delivery_dict[req_i][req_j] = distances[data_i['delivery_node']][data_j['delivery_node']]
-			
-			start_time_diff_pick_dict[req_i][req_j] = abs(data_i['pick_time'] - data_j['pick_time'])
-			start_time_diff_delivery_dict[req_i][req_j] = abs(data_i['delivery_time'] - data_j['delivery_time'])
-			
-			load_diff_dict[req_i][req_j] = abs(data_i['capacity'] - data_j['capacity'])
-			
-			intersection_size = len(data_i['vehicle_set'] & data_j['vehicle_set'])
-			min_set_size = min(len(data_i['vehicle_set']), len(data_j['vehicle_set']))
-			vehicle_set_diff[req_i][req_j] = 1 - intersection_size / min_set_size
-	
-	# normalize first five dict value
+	distances = meta_obj.distance_matrix
+	
+	# Cache node IDs, loads and vehicle masks for each request in parallel lists
+	request_list = [requests[req_id] for req_id in request_id_list]
+	pick_nodes = [req.pick_node_id for req in request_list]
+	delivery_nodes = [req.delivery_node_id for req in request_list]
+	capacities = [req.require_capacity for req in request_list]
+	vehicle_masks = [req.vehicle_mask for req in request_list]
+	vehicle_counts = [len(req.vehicle_set) for req in request_list]
+	
+	# Start service times indexed by node id, filled by walking every route once
+	start_times = [0.0] * len(distances)
+	for path in one_solution.paths.values():
+		for node_id, start_time in zip(path.route, path.start_service_time_line):
+			start_times[node_id] = start_time
+	pick_times = list(map(start_times.__getitem__, pick_nodes))
+	delivery_times = list(map(start_times.__getitem__, delivery_nodes))
+	
+	distance_pick, distance_delivery, start_time_diff_pick, start_time_diff_delivery, load_diff, vehicle_set_diff = \
+		_fill_pair_rows(pick_nodes, delivery_nodes, pick_times, delivery_times, capacities,
+		                vehicle_masks, vehicle_counts, distances)
+	
+	# normalize first five arrays
 	normalization_obj = InnerDictForNormalization()
-	normalization_obj.distance_pick_dict = _normalize_dict(distance_pic_dict)
-	normalization_obj.distance_delivery_dict = _normalize_dict(distance_delivery_dict)
-	normalization_obj.start_time_diff_pick_dict = _normalize_dict(start_time_diff_pick_dict)
-	normalization_obj.start_time_diff_delivery_dict = _normalize_dict(start_time_diff_delivery_dict)
-	normalization_obj.load_diff_dict = _normalize_dict(load_diff_dict)
+	normalization_obj.set_request_ids(request_id_list)
+	normalization_obj.distance_pick = _normalize_array(distance_pick)
+	normalization_obj.distance_delivery = _normalize_array(distance_delivery)
+	normalization_obj.start_time_diff_pick = _normalize_array(start_time_diff_pick)
+	normalization_obj.start_time_diff_delivery = _normalize_array(start_time_diff_delivery)
+	normalization_obj.load_diff = _normalize_array(load_diff)
 	
 	# need not be normalized
-	normalization_obj.vehicle_set_diff_dict = vehicle_set_diff
+	normalization_obj.vehicle_set_diff = array('d', vehicle_set_diff)
 	
 	return normalization_obj
 
 
-def generate_solution_finger_print(paths: Dict[int, Path]) -> str:
+def generate_solution_finger_print(paths: Dict[int, Path], sorted_vehicle_ids: Optional[List[int]] = None) -> str:
 	"""Generate a robust fingerprint for the solution based on paths.
 	
-	Uses a more reliable approach than string conversion by directly hashing
-	the structured route data to avoid string representation instabilities.
+	Hashes the route digest of every path in vehicle id order. Each path caches
+	its digest of the vehicle id and raw int32 route bytes, so only routes changed
+	since the last call are rehashed.
 	
 	Args:
 		paths: Dictionary mapping vehicle IDs to their paths
+		sorted_vehicle_ids: Keys of paths in ascending order, sorted here if not given
 		
 	Returns:
 		Hexadecimal fingerprint string
@@ -204,28 +241,62 @@ def generate_solution_finger_print(paths: Dict[int, Path]) -> str:
 	if paths is None:
 		raise ValueError("paths cannot be None")
 	
-	# Create a deterministic representation using sorted tuples
-	route_data = []
-	for vehicle_id in sorted(paths.keys()):
+	if sorted_vehicle_ids is None:
+		sorted_vehicle_ids = sorted(paths.keys())
+	
+	# Combine the per-path digests, each cached on its Path until the route changes
+	hasher = hashlib.blake2b(digest_size=16)
+	for vehicle_id in sorted_vehicle_ids:
 		path = paths[vehicle_id]
 		if path is None:
 			raise ValueError(f"Path for vehicle {vehicle_id} is None")
 		if path.route is None:
 			raise ValueError(f"Route for vehicle {vehicle_id} is None")
 		
-		# Create tuple of (vehicle_id, tuple_of_route_nodes)
-		route_tuple = (vehicle_id, tuple(path.route))
-		route_data.append(route_tuple)
+		hasher.update(path.route_digest())
+	
+	return hasher.hexdigest()
+
+
+class SolutionSnapshot:
+	"""Rollback journal of a PDWTWSolution, returned by PDWTWSolution.snapshot()
 	
-	# Convert to bytes in a deterministic way
-	fingerprint_data = str(tuple(route_data)).encode('utf-8')
+	Only the routes and requests touched after the snapshot are recorded, each
+	one the first time it is touched, so taking and restoring a snapshot costs
+	O(touched routes) instead of a full solution copy.
+	"""
 	
-	# Use a faster hash function for better performance
-	import hashlib
-	return hashlib.blake2b(fingerprint_data, digest_size=16).hexdigest()
+	__slots__ = ('original_paths', 'original_vehicle_of_request', 'sorted_vehicle_ids', 'sorted_request_ids',
+	             'distance_cost', 'time_cost', 'finger_print', 'finger_print_dirty')
+	
+	def __init__(self, one_solution: PDWTWSolution) -> None:
+		# vehicle_id -> Path before the first change, None if the vehicle had no route
+		self.original_paths: Dict[int, Optional[Path]] = {}
+		# request_id -> vehicle_id before the first change, None if the request was in the request bank
+		self.original_vehicle_of_request: Dict[int, Optional[int]] = {}
+		
+		self.sorted_vehicle_ids = one_solution._sorted_vehicle_ids.copy()
+		# never mutated in place, so it can be shared
+		self.sorted_request_ids = one_solution._sorted_request_ids
+		self.distance_cost = one_solution._distance_cost
+		self.time_cost = one_solution._time_cost
+		self.finger_print = one_solution._finger_print
+		self.finger_print_dirty = one_solution._finger_print_dirty
+	
+	def record_path(self, vehicle_id: int, the_path: Optional[Path], will_mutate_in_place: bool) -> None:
+		if vehicle_id not in self.original_paths:
+			if the_path is not None and will_mutate_in_place:
+				the_path = the_path.copy()
+			self.original_paths[vehicle_id] = the_path
+	
+	def record_request(self, request_id: int, vehicle_id: Optional[int]) -> None:
+		if request_id not in self.original_vehicle_of_request:
+			self.original_vehicle_of_request[request_id] = vehicle_id
 
 
 class Solution(ABC):
+	__slots__ = ()
+	
 	@abc.abstractmethod
 	def __init__(self, meta_obj: Meta):
 		pass
@@ -234,6 +305,10 @@ class Solution(ABC):
 class PDWTWSolution(Solution):
 	"""Solution class for Pickup and Delivery Problem with Time Windows (PDWTW)"""
 	
+	__slots__ = ('meta_obj', 'paths', '_sorted_vehicle_ids', 'request_bank', 'request_id_to_vehicle_id', '_sorted_request_ids',
+	             'vehicle_to_request_ids', 'node_id_to_vehicle_id', 'vehicle_bank', '_max_vehicle_id', '_distance_cost', '_time_cost',
+	             '_finger_print', '_finger_print_dirty', '_snapshot')
+	
 	def __init__(self, meta_obj: Meta):
 		"""
 		Initialize a PDWTW solution
@@ -244,47 +319,82 @@ class PDWTWSolution(Solution):
 		self.meta_obj = meta_obj
 		# vehicle_id -> Path
 		self.paths: Dict[int, Path] = {}
-		self.request_bank = set([request_id for request_id in meta_obj.requests])
+		# keys of paths in ascending order
+		self._sorted_vehicle_ids: List[int] = []
+		self.request_bank = set(meta_obj.requests)
 		self.request_id_to_vehicle_id: Dict[int, int] = {}
+		# keys of request_id_to_vehicle_id in ascending order, built lazily and dropped on every change
+		self._sorted_request_ids: Optional[List[int]] = None
+		# reverse of request_id_to_vehicle_id, only vehicles with a route have an entry
+		self.vehicle_to_request_ids: Dict[int, Set[int]] = {}
 		
 		# only preserve pickup and delivery node id map
 		self.node_id_to_vehicle_id: Dict[int, int] = {}
 		
-		self.vehicle_bank = set([vehicle_id for vehicle_id in meta_obj.vehicles])
+		self.vehicle_bank = set(meta_obj.vehicles)
+		# largest id over paths and vehicle_bank, only changes when vehicles are added or deleted
+		self._max_vehicle_id: Optional[int] = max(self.vehicle_bank, default=None)
 		
-		self.distance_cost = 0.0
-		self.time_cost = 0.0
+		# running totals over all paths, updated with the deltas of every route change
+		self._distance_cost = 0.0
+		self._time_cost = 0.0
 		
 		self._finger_print = None  # Lazy computation
 		self._finger_print_dirty = True
+		
+		# active rollback journal, see snapshot()
+		self._snapshot: Optional[SolutionSnapshot] = None
 	
 	@property
 	def finger_print(self):
-		"""Lazy computation of fingerprint"""
+		"""Lazy computation of fingerprint, only on the first read after a change"""
 		if self._finger_print_dirty or self._finger_print is None:
-			self._finger_print = generate_solution_finger_print(self.paths)
+			self._finger_print = generate_solution_finger_print(self.paths, self._sorted_vehicle_ids)
 			self._finger_print_dirty = False
 		return self._finger_print
 	
+	@property
+	def sorted_request_ids(self) -> List[int]:
+		"""Ids of the requests served by the solution in ascending order, must not be modified"""
+		if self._sorted_request_ids is None:
+			self._sorted_request_ids = sorted(self.request_id_to_vehicle_id)
+		return self._sorted_request_ids
+	
 	def _mark_finger_print_dirty(self):
 		"""Mark fingerprint as needing recomputation"""
 		self._finger_print_dirty = True
 	
+	@property
+	def distance_cost(self) -> float:
+		"""Total distance cost of all paths"""
+		return self._distance_cost
+	
+	@property
+	def time_cost(self) -> float:
+		"""Total time cost of all paths"""
+		return self._time_cost
+	
 	# this interface only use for problems with homogeneous fleet
 	def add_one_same_vehicle(self, one_vehicle_id: int = None) -> int:
 		"""Add one more vehicle of the same type to the solution"""
+		if self._snapshot is not None:
+			raise RuntimeError("Cannot add a vehicle while a snapshot is active")
 		new_vehicle_id = self.meta_obj.add_one_same_vehicle(one_vehicle_id)
 		# update one_solution
 		self.vehicle_bank.add(new_vehicle_id)
+		if self._max_vehicle_id is None or new_vehicle_id > self._max_vehicle_id:
+			self._max_vehicle_id = new_vehicle_id
 		return new_vehicle_id
 	
 	# this interface only use for problems with homogeneous fleet
 	def delete_vehicle_and_its_route(self, delete_vehicle_id: int):
 		"""Delete a vehicle and its associated route"""
+		if self._snapshot is not None:
+			raise RuntimeError("Cannot delete a vehicle while a snapshot is active")
 		if delete_vehicle_id not in self.paths and delete_vehicle_id not in self.vehicle_bank:
 			raise ValueError(f"Vehicle {delete_vehicle_id} not found in solution")
 		
-		deleted_requests = set([request_id for request_id, vehicle_id in self.request_id_to_vehicle_id.items() if delete_vehicle_id == vehicle_id])
+		deleted_requests = self.vehicle_to_request_ids.get(delete_vehicle_id, set()).copy()
 		self.remove_requests(deleted_requests)
 		
 		# Assert that delete_vehicle_id is definitely deleted from self.paths after remove_requests
@@ -292,17 +402,29 @@ class PDWTWSolution(Solution):
 		
 		assert delete_vehicle_id in self.vehicle_bank
 		self.vehicle_bank.remove(delete_vehicle_id)
+		if delete_vehicle_id == self._max_vehicle_id:
+			# ids are usually dense, so the next id down is the new maximum; scan only otherwise
+			next_vehicle_id = delete_vehicle_id - 1
+			if next_vehicle_id in self.vehicle_bank or next_vehicle_id in self.paths:
+				self._max_vehicle_id = next_vehicle_id
+			else:
+				self._max_vehicle_id = max(self.vehicle_bank.union(self.paths), default=None)
 		
 		self.meta_obj.delete_vehicle(delete_vehicle_id)
 		
 	def _copy_without_meta_obj(self, new_obj : PDWTWSolution) -> None:
+		new_obj._sorted_vehicle_ids = self._sorted_vehicle_ids.copy()
 		new_obj.request_bank = self.request_bank.copy()
 		new_obj.request_id_to_vehicle_id = self.request_id_to_vehicle_id.copy()
+		new_obj._sorted_request_ids = self._sorted_request_ids
+		new_obj.vehicle_to_request_ids = {vehicle_id: request_ids.copy()
+		                                  for vehicle_id, request_ids in self.vehicle_to_request_ids.items()}
 		new_obj.node_id_to_vehicle_id = self.node_id_to_vehicle_id.copy()
 		new_obj.vehicle_bank = self.vehicle_bank.copy()
+		new_obj._max_vehicle_id = self._max_vehicle_id
 		
-		new_obj.distance_cost = self.distance_cost
-		new_obj.time_cost = self.time_cost
+		new_obj._distance_cost = self._distance_cost
+		new_obj._time_cost = self._time_cost
 		
 		new_obj._finger_print = self._finger_print
 		new_obj._finger_print_dirty = self._finger_print_dirty
@@ -326,6 +448,68 @@ class PDWTWSolution(Solution):
 		self._copy_without_meta_obj(new_obj)
 		return new_obj
 
+	def snapshot(self) -> SolutionSnapshot:
+		"""
+		Start recording changes so that they can be rolled back later
+		
+		Use this instead of copy() when a candidate move is applied, evaluated and
+		possibly discarded. Vehicles must not be added or deleted while a snapshot
+		is active.
+		
+		Returns:
+			Opaque token for restore() or release_snapshot()
+		"""
+		if self._snapshot is not None:
+			raise RuntimeError("A snapshot is already active on this solution")
+		self._snapshot = SolutionSnapshot(self)
+		return self._snapshot
+	
+	def release_snapshot(self, token: SolutionSnapshot) -> None:
+		"""Keep all changes made since the snapshot and stop recording"""
+		if token is not self._snapshot:
+			raise RuntimeError("Snapshot token is not the active snapshot of this solution")
+		self._snapshot = None
+	
+	def restore(self, token: SolutionSnapshot) -> None:
+		"""Roll back all changes made since the snapshot and stop recording"""
+		if token is not self._snapshot:
+			raise RuntimeError("Snapshot token is not the active snapshot of this solution")
+		
+		for vehicle_id, the_path in token.original_paths.items():
+			if the_path is None:
+				self.paths.pop(vehicle_id, None)
+				self.vehicle_bank.add(vehicle_id)
+			else:
+				self.paths[vehicle_id] = the_path
+				self.vehicle_bank.discard(vehicle_id)
+		
+		for request_id, vehicle_id in token.original_vehicle_of_request.items():
+			request_obj = self.meta_obj.requests[request_id]
+			current_vehicle_id = self.request_id_to_vehicle_id.get(request_id)
+			if current_vehicle_id is not None:
+				self._unlink_request_from_vehicle(request_id, current_vehicle_id)
+			if vehicle_id is not None:
+				self.vehicle_to_request_ids.setdefault(vehicle_id, set()).add(request_id)
+			
+			if vehicle_id is None:
+				self.request_bank.add(request_id)
+				self.request_id_to_vehicle_id.pop(request_id, None)
+				self.node_id_to_vehicle_id.pop(request_obj.pick_node_id, None)
+				self.node_id_to_vehicle_id.pop(request_obj.delivery_node_id, None)
+			else:
+				self.request_bank.discard(request_id)
+				self.request_id_to_vehicle_id[request_id] = vehicle_id
+				self.node_id_to_vehicle_id[request_obj.pick_node_id] = vehicle_id
+				self.node_id_to_vehicle_id[request_obj.delivery_node_id] = vehicle_id
+		
+		self._sorted_vehicle_ids = token.sorted_vehicle_ids
+		self._sorted_request_ids = token.sorted_request_ids
+		self._distance_cost = token.distance_cost
+		self._time_cost = token.time_cost
+		self._finger_print = token.finger_print
+		self._finger_print_dirty = token.finger_print_dirty
+		self._snapshot = None
+	
 	def cost_if_remove_request(self, request_id: int) -> float:
 		"""Calculate the cost if a request is removed from the solution"""
 		if request_id not in self.request_id_to_vehicle_id:
@@ -339,8 +523,7 @@ class PDWTWSolution(Solution):
 		if origin_path is None:
 			raise RuntimeError(f"Path for vehicle {vehicle_id} is None")
 		
-		copied_path = origin_path.copy()
-		distance_diff, time_diff = copied_path.try_to_remove_request(request_id)
+		distance_diff, time_diff = origin_path.delta_if_remove_request(request_id)
 		
 		return self.meta_obj.parameters.alpha * distance_diff + self.meta_obj.parameters.beta * time_diff
 	
@@ -355,20 +538,51 @@ class PDWTWSolution(Solution):
 		if vehicle_id not in self.meta_obj.requests[request_id].vehicle_set:
 			return False, 0.0
 		
-
-		
-		if vehicle_id in self.paths:
-			the_path = self.paths[vehicle_id].copy()
-		else:
-			the_path = Path(vehicle_id, self.meta_obj)
-		
-		ok, distance_diff, time_diff, _ = the_path.try_to_insert_request_optimal(request_id)
-		
+		ok, distance_diff, time_diff, _ = self._optimal_insertion(request_id, vehicle_id, False)
 		if not ok:
 			return False, 0.0
 		
 		return True, self.meta_obj.parameters.alpha * distance_diff + self.meta_obj.parameters.beta * time_diff
 	
+	def _optimal_insertion(self, request_id: int, vehicle_id: int,
+	                       build_path: bool) -> Tuple[bool, float, float, Optional[Path]]:
+		"""
+		Optimal insertion of a request into the route of a vehicle, like Path.try_to_insert_request_optimal
+		
+		The result only depends on the route, so it is cached on meta by route digest;
+		an empty route is fully determined by its vehicle id. The cache keeps the chosen
+		positions, so on a hit the new path is rebuilt by a single insertion at them,
+		and only if build_path is set.
+		"""
+		path_obj = self.paths.get(vehicle_id)
+		cache_key = (path_obj.route_digest() if path_obj is not None else vehicle_id, request_id)
+		cached = self.meta_obj.get_cached_insertion_cost(cache_key)
+		if cached is None:
+			the_path = path_obj if path_obj is not None else Path(vehicle_id, self.meta_obj)
+			ok, distance_diff, time_diff, optimal_path = the_path.try_to_insert_request_optimal(request_id)
+			if ok:
+				request_obj = self.meta_obj.requests[request_id]
+				pick_insert_idx = optimal_path.route.index(request_obj.pick_node_id)
+				delivery_insert_idx = optimal_path.route.index(request_obj.delivery_node_id)
+			else:
+				pick_insert_idx = delivery_insert_idx = 0
+			self.meta_obj.cache_insertion_cost(cache_key, (ok, distance_diff, time_diff, pick_insert_idx, delivery_insert_idx))
+			return ok, distance_diff, time_diff, optimal_path
+		
+		ok, distance_diff, time_diff, pick_insert_idx, delivery_insert_idx = cached
+		if not ok or not build_path:
+			return ok, distance_diff, time_diff, None
+		optimal_path = path_obj.copy() if path_obj is not None else Path(vehicle_id, self.meta_obj)
+		optimal_path.try_to_insert_request(request_id, pick_insert_idx, delivery_insert_idx)
+		return ok, distance_diff, time_diff, optimal_path
+	
+	def _unlink_request_from_vehicle(self, request_id: int, vehicle_id: int) -> None:
+		"""Drop request_id from vehicle_to_request_ids, and the vehicle entry once it is empty"""
+		request_ids = self.vehicle_to_request_ids[vehicle_id]
+		request_ids.discard(request_id)
+		if not request_ids:
+			del self.vehicle_to_request_ids[vehicle_id]
+	
 	def remove_requests(self, request_id_set):
 		"""Remove multiple requests from the solution"""
 		for request_id in request_id_set:
@@ -380,21 +594,32 @@ class PDWTWSolution(Solution):
 				raise RuntimeError(f"Vehicle {vehicle_id} not found in paths")
 			
 			path_obj = self.paths[vehicle_id]
-			_, __ = path_obj.try_to_remove_request(request_id)
+			if self._snapshot is not None:
+				self._snapshot.record_path(vehicle_id, path_obj, True)
+				self._snapshot.record_request(request_id, vehicle_id)
+			distance_diff, time_diff = path_obj.try_to_remove_request(request_id)
+			self._distance_cost -= distance_diff
+			self._time_cost -= time_diff
 			
 			# update Solution's inner data structure
 			self.request_bank.add(request_id)
 			del self.request_id_to_vehicle_id[request_id]
+			self._unlink_request_from_vehicle(request_id, vehicle_id)
 			request_obj = self.meta_obj.requests[request_id]
 			pick_node_id = request_obj.pick_node_id
 			delivery_node_id = request_obj.delivery_node_id
 			del self.node_id_to_vehicle_id[pick_node_id]
 			del self.node_id_to_vehicle_id[delivery_node_id]
 			if path_obj.is_path_free():
+				# the remaining depot-to-depot route no longer counts
+				self._distance_cost -= path_obj.whole_distance_cost
+				self._time_cost -= path_obj.whole_time_cost
 				del self.paths[vehicle_id]
+				self._sorted_vehicle_ids.remove(vehicle_id)
 				self.vehicle_bank.add(vehicle_id)
-			
-			self._update_objective_cost_all()
+		
+		if request_id_set:
+			self._sorted_request_ids = None
 			self._mark_finger_print_dirty()
 	
 	def insert_one_request_to_one_vehicle_route_optimal(self, request_id: int, vehicle_id: int) -> bool:
@@ -402,27 +627,35 @@ class PDWTWSolution(Solution):
 		if request_id not in self.request_bank:
 			raise ValueError(f"Request {request_id} not in request bank")
 		
-		if vehicle_id not in self.meta_obj.requests[request_id].vehicle_set:
+		request_obj = self.meta_obj.requests[request_id]
+		if vehicle_id not in request_obj.vehicle_set:
 			return False
 		
-		if vehicle_id in self.vehicle_bank:
-			the_path = Path(vehicle_id, self.meta_obj)
-		else:
-			if vehicle_id not in self.paths:
-				raise ValueError(f"Vehicle {vehicle_id} not found in paths")
-			the_path = self.paths[vehicle_id]
+		if vehicle_id not in self.vehicle_bank and vehicle_id not in self.paths:
+			raise ValueError(f"Vehicle {vehicle_id} not found in paths")
 		
-		ok, _, __, optimal_path = the_path.try_to_insert_request_optimal(request_id)
+		ok, distance_diff, time_diff, optimal_path = self._optimal_insertion(request_id, vehicle_id, True)
 		if ok:
+			if self._snapshot is not None:
+				# the current path object is replaced, not mutated
+				self._snapshot.record_path(vehicle_id, self.paths.get(vehicle_id), False)
+				self._snapshot.record_request(request_id, None)
 			self.request_bank.remove(request_id)
 			self.request_id_to_vehicle_id[request_id] = vehicle_id
+			self.vehicle_to_request_ids.setdefault(vehicle_id, set()).add(request_id)
+			if vehicle_id not in self.paths:
+				insort(self._sorted_vehicle_ids, vehicle_id)
+				# a new route also brings its depot-to-depot cost
+				empty_path = Path(vehicle_id, self.meta_obj)
+				distance_diff += empty_path.whole_distance_cost
+				time_diff += empty_path.whole_time_cost
+			self._distance_cost += distance_diff
+			self._time_cost += time_diff
 			self.paths[vehicle_id] = optimal_path
-			request_obj = self.meta_obj.requests[request_id]
 			self.node_id_to_vehicle_id[request_obj.pick_node_id] = vehicle_id
 			self.node_id_to_vehicle_id[request_obj.delivery_node_id] = vehicle_id
-			if vehicle_id in self.vehicle_bank:
-				self.vehicle_bank.remove(vehicle_id)
-			self._update_objective_cost_all()
+			self.vehicle_bank.discard(vehicle_id)
+			self._sorted_request_ids = None
 			self._mark_finger_print_dirty()
 		return ok
 	
@@ -431,9 +664,19 @@ class PDWTWSolution(Solution):
 		if request_id not in self.request_bank:
 			raise ValueError(f"Request {request_id} not in request bank")
 		
-		vehicle_id_list = list(self.meta_obj.requests[request_id].vehicle_set & (self.vehicle_bank | self.paths.keys()))
+		request_obj = self.meta_obj.requests[request_id]
+		vehicle_set = request_obj.vehicle_set
 		
-		for vehicle_id in vehicle_id_list:
+		# used routes first, closest route tail to the pickup first: a cheap guess at which
+		# vehicle accepts the request, so the first success usually comes early;
+		# empty vehicles from the bank are only tried afterwards
+		pick_distances = self.meta_obj.distance_matrix[request_obj.pick_node_id]
+		paths = self.paths
+		used_vehicle_ids = [vehicle_id for vehicle_id in self._sorted_vehicle_ids if vehicle_id in vehicle_set]
+		used_vehicle_ids.sort(key=lambda vehicle_id: pick_distances[paths[vehicle_id].route[-2]])
+		bank_vehicle_ids = sorted(vehicle_set.intersection(self.vehicle_bank))
+		
+		for vehicle_id in used_vehicle_ids + bank_vehicle_ids:
 			if self.insert_one_request_to_one_vehicle_route_optimal(request_id, vehicle_id):
 				return True
 		
@@ -452,26 +695,20 @@ class PDWTWSolution(Solution):
 		return path_obj.get_node_start_service_time(node_id)
 	
 	def _update_objective_cost_all(self) -> None:
-		"""Update the total distance and time costs for all paths"""
-		self.distance_cost = 0.0
-		self.time_cost = 0.0
+		"""Recount the total distance and time costs from all paths, e.g. to resync the running totals"""
+		self._distance_cost = 0.0
+		self._time_cost = 0.0
 		for vehicle_id in self.paths:
-			self.distance_cost += self.paths[vehicle_id].whole_distance_cost
-			self.time_cost += self.paths[vehicle_id].whole_time_cost
+			self._distance_cost += self.paths[vehicle_id].whole_distance_cost
+			self._time_cost += self.paths[vehicle_id].whole_time_cost
 			
 	def max_vehicle_id(self):
 		"""Get the maximum vehicle ID in the solution"""
-		if not self.paths and not self.vehicle_bank:
-			return None
-		
-		paths_max = max(self.paths.keys()) if self.paths else 0
-		bank_max = max(self.vehicle_bank) if self.vehicle_bank else 0
-		max_vehicle_id = max(paths_max, bank_max)
-		
-		if hasattr(self.meta_obj, 'max_vehicle_id'):
-			if max_vehicle_id != self.meta_obj.max_vehicle_id():
-				raise RuntimeError(f"Vehicle ID mismatch: {max_vehicle_id} != {self.meta_obj.max_vehicle_id()}")
-		
+		max_vehicle_id = self._max_vehicle_id
+		# kept up to date by add_one_same_vehicle and delete_vehicle_and_its_route; the cross-check
+		# scans all vehicles of meta_obj, so it only runs in debug mode
+		assert max_vehicle_id is None or max_vehicle_id == self.meta_obj.max_vehicle_id(), \
+			f"Vehicle ID mismatch: {max_vehicle_id} != {self.meta_obj.max_vehicle_id()}"
 		return max_vehicle_id
 	
 	@property
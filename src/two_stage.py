@@ -24,8 +24,13 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import os
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
 from solution import PDWTWSolution
-from alns import adaptive_large_neighbourhood_search
+from alns import adaptive_large_neighbourhood_search, OperatorWeights
 
 
 class TwoStageError(Exception):
@@ -33,7 +38,8 @@ class TwoStageError(Exception):
     pass
 
 
-def first_stage_to_limit_vehicle_num_in_homogeneous_fleet(one_solution: PDWTWSolution) -> PDWTWSolution:
+def first_stage_to_limit_vehicle_num_in_homogeneous_fleet(one_solution: PDWTWSolution, max_workers: int = 1,
+                                                          operator_weights: Optional[OperatorWeights] = None) -> PDWTWSolution:
     """
     First stage: minimize the number of vehicles in a homogeneous fleet.
     
@@ -43,6 +49,11 @@ def first_stage_to_limit_vehicle_num_in_homogeneous_fleet(one_solution: PDWTWSol
     
     Args:
         one_solution: Initial solution to optimize
+        max_workers: Worker processes of phase 2; with more than one, the vehicles with the
+            largest ids are tried for removal at the same time, see _remove_vehicles_in_parallel
+        operator_weights: Operator weights the ALNS runs of phase 2 start from and adapt in place,
+            fresh ones for every run if None; the parallel phase 2 continues from the weights
+            of the attempt it keeps
         
     Returns:
         Optimized solution with minimal vehicle count
@@ -53,17 +64,29 @@ def first_stage_to_limit_vehicle_num_in_homogeneous_fleet(one_solution: PDWTWSol
     if one_solution is None:
         raise ValueError("one_solution cannot be None")
     
+    # meta_obj and its parameters stay the same objects across the ALNS results below
+    meta_obj = one_solution.meta_obj
+    
+    # A request no vehicle can carry would only keep adding vehicles in phase 1
+    max_capacity = max((vehicle.capacity for vehicle in meta_obj.vehicles.values()), default=0.0)
+    for request_id in one_solution.request_bank:
+        if meta_obj.requests[request_id].require_capacity > max_capacity:
+            raise TwoStageError(f"Request {request_id} requires capacity {meta_obj.requests[request_id].require_capacity}, "
+                                f"more than any vehicle has ({max_capacity})")
+    
     # Phase 1: Insert all requests by adding vehicles as needed
-    requests_in_bank = list(one_solution.request_bank)
+    requests_in_bank = deque(one_solution.request_bank)
     
     a_iteration_num = 0
-    max_iterations = 1000  # Prevent infinite loops
+    # Prevent infinite loops: every failed insertion adds a vehicle and must be followed by
+    # a successful one, so each request takes at most two iterations
+    max_iterations = 2 * len(requests_in_bank)
     new_vehicle_add_flag = False
     
     while requests_in_bank and a_iteration_num < max_iterations:
         a_iteration_num += 1
         
-        current_request = requests_in_bank.pop(0)
+        current_request = requests_in_bank.popleft()
         if one_solution.insert_one_request_to_any_vehicle_route_optimal(current_request):
             new_vehicle_add_flag = False
             continue
@@ -77,7 +100,7 @@ def first_stage_to_limit_vehicle_num_in_homogeneous_fleet(one_solution: PDWTWSol
             requests_in_bank.append(current_request)
             new_vehicle_add_flag = True
     
-    if a_iteration_num >= max_iterations:
+    if requests_in_bank:
         raise TwoStageError(f"First stage failed to converge after {max_iterations} iterations")
     
     result_solution = one_solution.copy_with_deep_copied_meta()
@@ -91,47 +114,133 @@ def first_stage_to_limit_vehicle_num_in_homogeneous_fleet(one_solution: PDWTWSol
     
     # Phase 2: Iteratively remove vehicles and try to reassign requests
     total_iteration_num = a_iteration_num
-    max_total_iterations = one_solution.meta_obj.parameters.theta
+    params = meta_obj.parameters
+    max_total_iterations = params.theta
     
-    while total_iteration_num <= max_total_iterations:
-        # Get the vehicle with maximum ID to remove
-        max_vehicle_id = one_solution.max_vehicle_id()
-        if max_vehicle_id is None:
-            break
-        
-        print("loop num :", total_iteration_num, ", vehicle num : ", len(one_solution.paths))
+    # ALNS runs with tau iterations per call here, the override is undone on the way out
+    with params.override(iteration_num=params.tau):
+        if max_workers > 1:
+            result_solution = _remove_vehicles_in_parallel(one_solution, result_solution, total_iteration_num,
+                                                           max_total_iterations, max_workers, operator_weights)
+            return result_solution
+    
+        while total_iteration_num <= max_total_iterations:
+            # Get the vehicle with maximum ID to remove
+            max_vehicle_id = one_solution.max_vehicle_id()
+            if max_vehicle_id is None:
+                break
         
-        # Remove the vehicle and its route
-        one_solution.delete_vehicle_and_its_route(max_vehicle_id)
+            print("loop num :", total_iteration_num, ", vehicle num : ", len(one_solution.paths))
         
-        # Temporarily modify parameters for ALNS
-        original_iteration_num = one_solution.meta_obj.parameters.iteration_num
-        one_solution.meta_obj.parameters.iteration_num = one_solution.meta_obj.parameters.tau
+            # Remove the vehicle and its route, recording what meta drops so a failed attempt can be undone
+            vehicle_record = meta_obj.record_vehicle(max_vehicle_id)
+            one_solution.delete_vehicle_and_its_route(max_vehicle_id)
         
-        try:
-            # Try to reassign requests using ALNS
-           one_solution, sub_iteration_num = adaptive_large_neighbourhood_search(one_solution.meta_obj, one_solution, insert_unlimited=True,
-                                                stop_if_all_request_coped=True)
+            try:
+                # Try to reassign requests using ALNS
+                one_solution, sub_iteration_num = adaptive_large_neighbourhood_search(meta_obj, one_solution, insert_unlimited=True,
+                                                     stop_if_all_request_coped=True,
+                                                     operator_weights=operator_weights)
+                
+                if not one_solution.request_bank:
+                    # Successfully reassigned all requests; the copy shares meta_obj with one_solution,
+                    # which is only changed again by the next vehicle deletion
+                    result_solution = one_solution.copy()
+                else:
+                    # Failed to reassign all requests, put the vehicle back for result_solution and stop here
+                    meta_obj.restore_vehicle(vehicle_record)
+                    break
+                
+                total_iteration_num += sub_iteration_num
+            except Exception as e:
+                # Handle any errors during ALNS, including vehicle deletion errors
+                print(f"Warning: ALNS failed during vehicle removal: {e}")
+                meta_obj.restore_vehicle(vehicle_record)
+                break
+    
+    return result_solution
+
+
+def _remove_vehicle_and_reassign(one_solution: PDWTWSolution, vehicle_id: int, seed: int,
+                                 operator_weights: Optional[OperatorWeights]) -> Tuple[PDWTWSolution, int, Optional[OperatorWeights]]:
+    """
+    Worker of _remove_vehicles_in_parallel: delete one vehicle and reassign its requests using ALNS
+    
+    Returns:
+        Tuple of (ALNS result, its iteration num, the operator weights adapted by the ALNS run)
+    """
+    random.seed(seed)
+    one_solution.delete_vehicle_and_its_route(vehicle_id)
+    attempt_solution, sub_iteration_num = adaptive_large_neighbourhood_search(one_solution.meta_obj, one_solution,
+                                                                              insert_unlimited=True,
+                                                                              stop_if_all_request_coped=True,
+                                                                              operator_weights=operator_weights)
+    return attempt_solution, sub_iteration_num, operator_weights
+
+
+def _remove_vehicles_in_parallel(one_solution: PDWTWSolution, result_solution: PDWTWSolution, total_iteration_num: int,
+                                 max_total_iterations: int, max_workers: int,
+                                 operator_weights: Optional[OperatorWeights] = None) -> PDWTWSolution:
+    """
+    Phase 2 of the first stage with several removal attempts per round.
+    
+    Each round removes each of the max_workers vehicles with the largest ids from
+    its own pickled copy of one_solution in a worker process. The cheapest attempt
+    that reassigns all requests is kept; the search stops when none of them does.
+    The ALNS iterations of every completed attempt count against max_total_iterations,
+    so the budget means the same number of iterations as in the sequential phase 2.
+    
+    Every attempt adapts its own pickled copy of operator_weights; if given, operator_weights
+    takes over the adapted weights of the attempt that is kept.
+    
+    Returns:
+        Last solution without unassigned requests, result_solution if there is none
+    """
+    params = one_solution.meta_obj.parameters
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        while total_iteration_num <= max_total_iterations:
+            candidate_vehicle_ids = sorted(one_solution.paths.keys() | one_solution.vehicle_bank, reverse=True)[:max_workers]
+            if not candidate_vehicle_ids:
+                break
             
-           if not  one_solution.request_bank:
-                # Successfully reassigned all requests
-                result_solution = one_solution.copy_with_deep_copied_meta()
-           else:
-                # Failed to reassign all requests, stop here
+            print("loop num :", total_iteration_num, ", vehicle num : ", len(one_solution.paths))
+            
+            futures = [executor.submit(_remove_vehicle_and_reassign, one_solution, vehicle_id, random.getrandbits(32),
+                                       operator_weights)
+                       for vehicle_id in candidate_vehicle_ids]
+            best_attempt = None
+            best_attempt_weights = None
+            for future in futures:
+                try:
+                    attempt_solution, sub_iteration_num, attempt_weights = future.result()
+                except Exception as e:
+                    # Handle any errors during ALNS, including vehicle deletion errors
+                    print(f"Warning: ALNS failed during vehicle removal: {e}")
+                    continue
+                total_iteration_num += sub_iteration_num
+                if not attempt_solution.request_bank and \
+                        (best_attempt is None or attempt_solution.objective_cost < best_attempt.objective_cost):
+                    best_attempt = attempt_solution
+                    best_attempt_weights = attempt_weights
+            
+            if best_attempt is None:
+                # No attempt reassigned all requests, stop here
                 break
-	            
-           total_iteration_num += sub_iteration_num
-        except Exception as e:
-            # Handle any errors during ALNS, including vehicle deletion errors
-            print(f"Warning: ALNS failed during vehicle removal: {e}")
-            break
-    
-    # Reset parameters to original values
-    result_solution.meta_obj.parameters.reset()
+            
+            # the attempt comes back with its own meta_obj, which keeps sharing the caller's parameters like Meta.copy
+            one_solution = best_attempt
+            one_solution.meta_obj.parameters = params
+            result_solution = one_solution.copy()
+            if operator_weights is not None:
+                operator_weights.removal = best_attempt_weights.removal
+                operator_weights.insertion = best_attempt_weights.insertion
+                operator_weights.noise = best_attempt_weights.noise
+    
     return result_solution
 
 
-def two_stage_algorithm_in_homogeneous_fleet(initial_solution: PDWTWSolution) -> PDWTWSolution:
+def two_stage_algorithm_in_homogeneous_fleet(initial_solution: PDWTWSolution, seed: Optional[int] = None,
+                                             max_workers: int = 1) -> PDWTWSolution:
     """
     Two-stage algorithm for solving PDWTW with homogeneous fleet.
     
@@ -140,6 +249,8 @@ def two_stage_algorithm_in_homogeneous_fleet(initial_solution: PDWTWSolution) ->
     
     Args:
         initial_solution: Initial solution to optimize
+        seed: Seed for the global random state, left untouched if None
+        max_workers: Worker processes for the vehicle removal attempts of stage 1
         
     Returns:
         Optimized solution
@@ -151,19 +262,29 @@ def two_stage_algorithm_in_homogeneous_fleet(initial_solution: PDWTWSolution) ->
     if initial_solution is None:
         raise ValueError("initial_solution cannot be None")
     
-    if not hasattr(initial_solution, 'meta_obj') or initial_solution.meta_obj is None:
+    # PDWTWSolution always sets meta_obj, so only its value needs checking
+    if not isinstance(initial_solution, PDWTWSolution):
+        raise ValueError("initial_solution must be a PDWTWSolution")
+    if initial_solution.meta_obj is None:
         raise ValueError("initial_solution must have a valid meta_obj")
     
+    if seed is not None:
+        random.seed(seed)
+    
+    # stage 2 starts from the operator weights adapted during stage 1 instead of equal ones
+    operator_weights = OperatorWeights(initial_solution.meta_obj.parameters.initial_weight)
+    
     try:
         # Stage 1: Minimize vehicle count
         print("start stage 1...")
-        result_solution = first_stage_to_limit_vehicle_num_in_homogeneous_fleet(initial_solution)
+        result_solution = first_stage_to_limit_vehicle_num_in_homogeneous_fleet(initial_solution, max_workers,
+                                                                                operator_weights)
         print("end stage 1, vehicle num : ", len(result_solution.paths))
 
         # Stage 2: Optimize using ALNS
         print("start stage 2...")
         final_result_solution, total_iteration_num = adaptive_large_neighbourhood_search(result_solution.meta_obj, result_solution, insert_unlimited=False,
-                                            stop_if_all_request_coped=False)
+                                            stop_if_all_request_coped=False, operator_weights=operator_weights)
         print("end stage 2...")
 
         return final_result_solution
@@ -172,3 +293,40 @@ def two_stage_algorithm_in_homogeneous_fleet(initial_solution: PDWTWSolution) ->
         raise TwoStageError(f"Two-stage algorithm failed: {str(e)}") from e
 
 
+def two_stage_algorithm_in_homogeneous_fleet_with_restarts(initial_solution: PDWTWSolution, restart_num: int,
+                                                           seed: int = 0,
+                                                           max_workers: Optional[int] = None) -> PDWTWSolution:
+    """
+    Run independent restarts of the two-stage algorithm in parallel processes.
+    
+    Restart k is seeded with seed + k and works on its own pickled copy of the
+    solution and meta object, so restarts share no state.
+    
+    Args:
+        initial_solution: Initial solution every restart starts from
+        restart_num: Number of restarts
+        seed: Seed of the first restart
+        max_workers: Number of worker processes, os.cpu_count() if None
+        
+    Returns:
+        Solution with the fewest vehicles, ties broken by objective cost
+        
+    Raises:
+        TwoStageError: If any restart fails
+        ValueError: If input is invalid
+    """
+    if initial_solution is None:
+        raise ValueError("initial_solution cannot be None")
+    
+    if restart_num <= 0:
+        raise ValueError("restart_num must be positive")
+    
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    
+    with ProcessPoolExecutor(max_workers=min(max_workers, restart_num)) as executor:
+        futures = [executor.submit(two_stage_algorithm_in_homogeneous_fleet, initial_solution, seed + k)
+                   for k in range(restart_num)]
+        results = [future.result() for future in futures]
+    
+    return min(results, key=lambda one_solution: (len(one_solution.paths), one_solution.objective_cost))
@@ -29,6 +29,8 @@ from __future__ import annotations
 
 
 class Vehicle:
+	__slots__ = ('identity', 'capacity', 'velocity', 'start_node_id', 'end_node_id')
+	
 	def __init__(self, identity: int, capacity: float, velocity: float, start_node_id: int, end_node_id: int):
 		self.identity: int = identity
 		self.capacity: float = capacity
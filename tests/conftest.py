@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# the modules of src import each other by plain module name
+sys.path.insert(0, os.path.join(ROOT_DIR, 'src'))
+
+from benchmark_reader_for_lim_dataset import LiLimBenchmarkReader
+from solution import PDWTWSolution
+
+
+@pytest.fixture
+def lr202_meta():
+    reader = LiLimBenchmarkReader()
+    reader.read_file(os.path.join(ROOT_DIR, 'benchmark', 'lr202.txt'))
+    return reader.get_meta_obj()
+
+
+@pytest.fixture
+def lr202_solution(lr202_meta):
+    """Solution of lr202 with every request inserted greedily in id order"""
+    one_solution = PDWTWSolution(lr202_meta)
+    for request_id in sorted(one_solution.request_bank):
+        assert one_solution.insert_one_request_to_any_vehicle_route_optimal(request_id)
+    return one_solution
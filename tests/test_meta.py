@@ -0,0 +1,49 @@
+import pytest
+
+
+def _meta_state(meta_obj):
+    run_time_tables = meta_obj.vehicle_run_between_nodes_time
+    return (dict(meta_obj.vehicles), dict(meta_obj.nodes),
+            {from_node_id: dict(to_node_dict) for from_node_id, to_node_dict in meta_obj.distances.items()},
+            {vehicle_id: {from_node_id: dict(to_node_dict) for from_node_id, to_node_dict in time_dict.items()}
+             for vehicle_id, time_dict in run_time_tables.items()},
+            # which vehicles share one run time table
+            sorted(sorted(vehicle_id for vehicle_id in run_time_tables if run_time_tables[vehicle_id] is time_dict)
+                   for time_dict in meta_obj.distinct_run_time_tables()),
+            {request_id: (set(one_request.vehicle_set), one_request.vehicle_mask)
+             for request_id, one_request in meta_obj.requests.items()})
+
+
+@pytest.mark.parametrize('vehicle_id', [1, 13, 25])
+def test_restore_vehicle_undoes_delete_vehicle(lr202_meta, vehicle_id):
+    state_before = _meta_state(lr202_meta)
+    distance_matrix_before = lr202_meta.distance_matrix
+    record = lr202_meta.record_vehicle(vehicle_id)
+    assert lr202_meta.delete_vehicle(vehicle_id)
+    assert vehicle_id not in lr202_meta.vehicles
+    
+    lr202_meta.restore_vehicle(record)
+    assert _meta_state(lr202_meta) == state_before
+    assert lr202_meta.distance_matrix == distance_matrix_before
+
+
+def test_restore_vehicle_undoes_deleting_a_used_vehicle_of_a_solution(lr202_solution):
+    meta_obj = lr202_solution.meta_obj
+    vehicle_id = max(lr202_solution.paths)
+    state_before = _meta_state(meta_obj)
+    record = meta_obj.record_vehicle(vehicle_id)
+    lr202_solution.delete_vehicle_and_its_route(vehicle_id)
+    
+    meta_obj.restore_vehicle(record)
+    assert _meta_state(meta_obj) == state_before
+
+
+def test_restore_vehicle_rejects_an_existing_vehicle(lr202_meta):
+    record = lr202_meta.record_vehicle(1)
+    with pytest.raises(ValueError):
+        lr202_meta.restore_vehicle(record)
+
+
+def test_record_vehicle_rejects_an_unknown_vehicle(lr202_meta):
+    with pytest.raises(ValueError):
+        lr202_meta.record_vehicle(max(lr202_meta.vehicles) + 1)
@@ -0,0 +1,38 @@
+import pytest
+
+from parameters import Parameters
+
+
+def test_override_restores_overridden_parameters():
+    params = Parameters()
+    iteration_num = params.iteration_num
+    with params.override(iteration_num=params.tau):
+        assert params.iteration_num == params.tau
+    assert params.iteration_num == iteration_num
+
+
+def test_override_restores_parameters_on_exception():
+    params = Parameters()
+    iteration_num = params.iteration_num
+    with pytest.raises(KeyError):
+        with params.override(iteration_num=5000):
+            raise KeyError
+    assert params.iteration_num == iteration_num
+
+
+def test_override_with_invalid_value_leaves_parameters_unchanged():
+    params = Parameters()
+    iteration_num, tau = params.iteration_num, params.tau
+    # iteration_num is valid and applied first, tau fails validation
+    with pytest.raises(ValueError):
+        with params.override(iteration_num=5000, tau=1):
+            pass
+    assert params.iteration_num == iteration_num
+    assert params.tau == tau
+
+
+def test_override_rejects_unknown_parameter():
+    params = Parameters()
+    with pytest.raises(ValueError):
+        with params.override(unknown_parameter=1):
+            pass
@@ -0,0 +1,18 @@
+import pytest
+
+
+def _path_state(the_path):
+    return (list(the_path.route), list(the_path.start_service_time_line), list(the_path.load_line),
+            list(the_path.distances))
+
+
+def test_delta_if_remove_request_matches_try_to_remove_request(lr202_solution):
+    for request_id, vehicle_id in lr202_solution.request_id_to_vehicle_id.items():
+        the_path = lr202_solution.paths[vehicle_id]
+        state_before = _path_state(the_path)
+        distance_diff, time_diff = the_path.delta_if_remove_request(request_id)
+        assert _path_state(the_path) == state_before
+        
+        expected_distance_diff, expected_time_diff = the_path.copy().try_to_remove_request(request_id)
+        assert distance_diff == pytest.approx(expected_distance_diff)
+        assert time_diff == pytest.approx(expected_time_diff)
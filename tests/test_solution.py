@@ -0,0 +1,115 @@
+import random
+
+import pytest
+
+from insertion import basic_greedy_insertion, regret_insertion_wrapper
+from removal import random_removal, shaw_removal, worst_removal
+
+
+def _no_noise(cost):
+    return cost
+
+
+def _path_state(the_path):
+    return (list(the_path.route), list(the_path.start_service_time_line), list(the_path.load_line),
+            list(the_path.distances))
+
+
+def _solution_state(one_solution):
+    paths = {vehicle_id: _path_state(the_path) for vehicle_id, the_path in one_solution.paths.items()}
+    return (paths, set(one_solution.request_bank), dict(one_solution.request_id_to_vehicle_id),
+            {vehicle_id: set(request_ids) for vehicle_id, request_ids in one_solution.vehicle_to_request_ids.items()},
+            dict(one_solution.node_id_to_vehicle_id), set(one_solution.vehicle_bank),
+            list(one_solution._sorted_vehicle_ids), list(one_solution.sorted_request_ids),
+            one_solution.distance_cost, one_solution.time_cost, one_solution.finger_print)
+
+
+def _destroy_and_repair(one_solution, seed, rounds=4):
+    """Mixed sequence of the removal and insertion operators of ALNS"""
+    random.seed(seed)
+    meta_obj = one_solution.meta_obj
+    for _ in range(rounds):
+        removal_operator = random.choice([random_removal, shaw_removal, worst_removal])
+        removal_operator(meta_obj, one_solution, random.randint(1, 8))
+        insertion_operator = random.choice([basic_greedy_insertion, regret_insertion_wrapper(2),
+                                            regret_insertion_wrapper(3)])
+        insertion_operator(meta_obj, one_solution, len(one_solution.request_bank), False, _no_noise)
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_restore_after_destroy_and_repair_gives_state_before_snapshot(lr202_solution, seed):
+    state_before = _solution_state(lr202_solution)
+    token = lr202_solution.snapshot()
+    _destroy_and_repair(lr202_solution, seed)
+    lr202_solution.restore(token)
+    assert _solution_state(lr202_solution) == state_before
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_release_snapshot_keeps_changes(lr202_solution, seed):
+    expected = lr202_solution.copy()
+    _destroy_and_repair(expected, seed)
+    token = lr202_solution.snapshot()
+    _destroy_and_repair(lr202_solution, seed)
+    lr202_solution.release_snapshot(token)
+    assert _solution_state(lr202_solution) == _solution_state(expected)
+
+
+def test_snapshot_rejects_a_second_active_snapshot(lr202_solution):
+    lr202_solution.snapshot()
+    with pytest.raises(RuntimeError):
+        lr202_solution.snapshot()
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_running_costs_match_recount_from_paths(lr202_solution, seed):
+    for round_num in range(3):
+        _destroy_and_repair(lr202_solution, seed * 10 + round_num)
+        recounted = lr202_solution.copy()
+        recounted._update_objective_cost_all()
+        assert lr202_solution.distance_cost == pytest.approx(recounted.distance_cost)
+        assert lr202_solution.time_cost == pytest.approx(recounted.time_cost)
+
+
+def test_running_costs_match_recount_after_a_route_is_emptied(lr202_solution):
+    vehicle_id = min(lr202_solution.paths)
+    lr202_solution.remove_requests(set(lr202_solution.vehicle_to_request_ids[vehicle_id]))
+    assert vehicle_id in lr202_solution.vehicle_bank
+    recounted = lr202_solution.copy()
+    recounted._update_objective_cost_all()
+    assert lr202_solution.distance_cost == pytest.approx(recounted.distance_cost)
+    assert lr202_solution.time_cost == pytest.approx(recounted.time_cost)
+
+
+def test_cached_insertion_matches_cold_insertion(lr202_solution):
+    meta_obj = lr202_solution.meta_obj
+    random_removal(meta_obj, lr202_solution, 6)
+    vehicle_ids = sorted(lr202_solution.paths) + [min(lr202_solution.vehicle_bank)]
+    for request_id in sorted(lr202_solution.request_bank):
+        for vehicle_id in vehicle_ids:
+            meta_obj.clear_insertion_cost_cache()
+            ok, distance_diff, time_diff, optimal_path = lr202_solution._optimal_insertion(request_id, vehicle_id, True)
+            cached_ok, cached_distance_diff, cached_time_diff, cached_path = \
+                lr202_solution._optimal_insertion(request_id, vehicle_id, True)
+            assert list(meta_obj._insertion_cost_hits.values()) == [1]
+            
+            assert (cached_ok, cached_distance_diff, cached_time_diff) == (ok, distance_diff, time_diff)
+            if ok:
+                assert _path_state(cached_path) == _path_state(optimal_path)
+            else:
+                assert cached_path is None
+
+
+def test_insertion_cache_evicts_least_hit_half_when_full(lr202_meta, monkeypatch):
+    monkeypatch.setattr(lr202_meta, 'INSERTION_COST_CACHE_SIZE', 4)
+    result = (True, 1.0, 1.0, 1, 2)
+    for request_id in range(4):
+        lr202_meta.cache_insertion_cost((0, request_id), result)
+    for _ in range(3):
+        lr202_meta.get_cached_insertion_cost((0, 1))
+    lr202_meta.get_cached_insertion_cost((0, 2))
+    
+    lr202_meta.cache_insertion_cost((0, 4), result)
+    assert set(lr202_meta._insertion_cost_cache) == {(0, 1), (0, 2), (0, 4)}
+    # hit counts of the survivors are halved
+    assert lr202_meta._insertion_cost_hits == {(0, 1): 1, (0, 2): 0, (0, 4): 0}
@@ -0,0 +1,51 @@
+import os
+import random
+
+import pytest
+
+from alns import OperatorWeights
+from benchmark_reader_for_lim_dataset import LiLimBenchmarkReader
+from parameters import Parameters
+from request import vehicle_mask_of
+from solution import PDWTWSolution
+from two_stage import first_stage_to_limit_vehicle_num_in_homogeneous_fleet
+
+# the first 16 requests of LRC1_2_3 with a fleet of 12 vehicles, small enough for phase 2 to finish in seconds
+SMALL_INSTANCE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'lrc1_2_3_16_requests.txt')
+
+
+@pytest.fixture
+def small_solution():
+    reader = LiLimBenchmarkReader()
+    reader.read_file(SMALL_INSTANCE_FILE)
+    meta_obj = reader.get_meta_obj()
+    meta_obj.parameters = Parameters(theta=1000, tau=1000)
+    return PDWTWSolution(meta_obj)
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_first_stage_keeps_meta_and_solution_vehicles_consistent(small_solution, max_workers):
+    vehicle_num = len(small_solution.meta_obj.vehicles)
+    random.seed(1)
+    operator_weights = OperatorWeights(small_solution.meta_obj.parameters.initial_weight)
+    result = first_stage_to_limit_vehicle_num_in_homogeneous_fleet(small_solution, max_workers, operator_weights)
+    meta_obj = result.meta_obj
+    
+    assert not result.request_bank
+    # phase 2 kept at least one vehicle removal
+    assert len(meta_obj.vehicles) < vehicle_num
+    assert not result.paths.keys() & result.vehicle_bank
+    assert result.paths.keys() | result.vehicle_bank == meta_obj.vehicles.keys()
+    assert set(result.request_id_to_vehicle_id.values()) == result.paths.keys()
+    for one_request in meta_obj.requests.values():
+        assert one_request.vehicle_set == meta_obj.vehicles.keys()
+        assert one_request.vehicle_mask == vehicle_mask_of(meta_obj.vehicles)
+    for the_path in result.paths.values():
+        assert all(node_id in meta_obj.nodes for node_id in the_path.route)
+    
+    recounted = result.copy()
+    recounted._update_objective_cost_all()
+    assert result.distance_cost == pytest.approx(recounted.distance_cost)
+    assert result.time_cost == pytest.approx(recounted.time_cost)
+    # the phase 2 parameter override is undone
+    assert meta_obj.parameters.iteration_num == Parameters().iteration_num